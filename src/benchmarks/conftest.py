@@ -0,0 +1,136 @@
+import json
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from docs import search
+from docs.models import Attachment, Blob, Document, fs
+from docs.revisions import record_revision
+from projects.models import Collaboration, Perms, Project
+from users.models import User
+
+BASELINES = Path(__file__).with_name('baselines.json')
+
+PROJECTS = 10000
+COLLABORATORS_PER_PROJECT = 10
+DOCUMENTS_PER_PROJECT = 10
+USERS = 2000
+ATTACHED_PROJECTS = 1000
+BATCH_SIZE = 2000
+
+results_key = pytest.StashKey()
+database_results_key = pytest.StashKey()
+serialization_results_key = pytest.StashKey()
+
+
+def pytest_configure(config):
+    config.stash[results_key] = {}
+    config.stash[database_results_key] = []
+    config.stash[serialization_results_key] = []
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if config.stash[database_results_key]:
+        terminalreporter.section('database benchmarks')
+        for profile, workload, value in config.stash[database_results_key]:
+            terminalreporter.write_line(f'{profile:<24} {workload:<32} {value}')
+
+    if config.stash[serialization_results_key]:
+        terminalreporter.section('serialization benchmarks')
+        for listing, rows, serializer_ms, projection_ms in config.stash[serialization_results_key]:
+            terminalreporter.write_line(f'{listing:<24} {rows:>6} rows  serializer {serializer_ms:>9.2f} ms  '
+                                        f'projection {projection_ms:>9.2f} ms  {serializer_ms / projection_ms:>5.1f}x')
+
+    results = config.stash[results_key]
+    if not results:
+        return
+
+    terminalreporter.section('endpoint benchmarks')
+    for name, result in sorted(results.items()):
+        terminalreporter.write_line(f'{name:<40} {result["queries"]:>6} queries {result["ms"]:>10.2f} ms')
+
+    if config.getoption('--benchmark-update'):
+        scale = config.getoption('--benchmark-scale')
+        BASELINES.write_text(json.dumps({'scale': scale, 'endpoints': dict(sorted(results.items()))}, indent=2) + '\n')
+        terminalreporter.write_line(f'Baselines written to {BASELINES}')
+
+
+@pytest.fixture(scope='session')
+def benchmark_results(request):
+    return request.config.stash[results_key]
+
+
+@pytest.fixture(scope='session')
+def database_results(request):
+    return request.config.stash[database_results_key]
+
+
+@pytest.fixture(scope='session')
+def serialization_results(request):
+    return request.config.stash[serialization_results_key]
+
+
+@pytest.fixture(scope='session')
+def baselines(request):
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {'endpoints': {}}
+    if stored.get('scale') != request.config.getoption('--benchmark-scale'):
+        # Latencies measured on another data volume are not comparable.
+        return {name: {'queries': baseline['queries'], 'ms': None} for name, baseline in stored['endpoints'].items()}
+    return stored['endpoints']
+
+
+def seed(scale):
+    users, projects = int(USERS * scale) or 1, int(PROJECTS * scale) or 1
+    password = make_password(None)
+
+    User.objects.bulk_create([User(email=f'user{number}@bench.local', password=password) for number in range(users)],
+                             batch_size=BATCH_SIZE)
+    Project.objects.bulk_create([Project(name=f'Project {number}') for number in range(projects)], batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    project_ids = list(Project.objects.order_by('pk').values_list('pk', flat=True))
+
+    collaborations, documents = [], []
+    for index, project_id in enumerate(project_ids):
+        members = dict.fromkeys(user_ids[(index + step * 211) % users] for step in range(COLLABORATORS_PER_PROJECT))
+        for position, user_id in enumerate(members):
+            access_level = Perms.OWNER if position == 0 else (Perms.EDIT if position % 2 else Perms.READ_ONLY)
+            collaborations.append(Collaboration(project_id=project_id, user_id=user_id, access_level=access_level))
+
+        for number in range(DOCUMENTS_PER_PROJECT):
+            document = Document(project_id=project_id, type='MD' if number % 2 else 'DOC',
+                                text='\n'.join(f'Line {line} of document {number} in project {index}' for line in range(40)))
+            document.prepare_text()
+            documents.append(document)
+
+        if len(documents) >= BATCH_SIZE:
+            Collaboration.objects.bulk_create(collaborations, batch_size=BATCH_SIZE)
+            Document.objects.bulk_create(documents, batch_size=BATCH_SIZE)
+            collaborations, documents = [], []
+
+    Collaboration.objects.bulk_create(collaborations, batch_size=BATCH_SIZE)
+    Document.objects.bulk_create(documents, batch_size=BATCH_SIZE)
+    Project.objects.sync_owners()
+    search.index_queryset(Document.objects.all(), BATCH_SIZE)
+
+    name = fs.save('benchmark.bin', ContentFile(b'\0' * 256 * 1024))
+    attached = project_ids[:int(ATTACHED_PROJECTS * scale) or 1]
+    Attachment.objects.bulk_create([Attachment(project_id=project_id, file=name, file_name='benchmark.bin')
+                                    for project_id in attached], batch_size=BATCH_SIZE)
+    Blob.objects.reference_many({name: (fs.size(name), len(attached))})
+
+    document = Document.objects.filter(project=project_ids[0]).first()
+    for revision in range(5):
+        document.text += f'\nRevision {revision}'
+        document.save()
+        record_revision(document)
+
+
+@pytest.fixture(scope='module')
+def benchmark_data(request, django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        seed(request.config.getoption('--benchmark-scale'))
+    yield
+    with django_db_blocker.unblock():
+        call_command('flush', interactive=False, verbosity=0)
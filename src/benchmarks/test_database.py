@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+import environ
+import pytest
+from django.db.utils import ConnectionHandler, OperationalError
+
+pytestmark = [pytest.mark.benchmark]
+
+ROUNDS = 300
+WINDOW = 1.0
+
+
+def sqlite_profiles(tmp_path):
+    return {
+        'sqlite-default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(tmp_path / 'default.sqlite3')},
+        'sqlite-tuned': {'ENGINE': 'todocs.db.backends.sqlite3', 'NAME': str(tmp_path / 'tuned.sqlite3')},
+    }
+
+
+def postgres_profiles():
+    url = os.environ.get('BENCHMARK_POSTGRES_URL')
+    if not url:
+        return {}
+    config = environ.Env.db_url_config(url)
+    return {
+        'postgres-per-request': {**config, 'ENGINE': 'django.db.backends.postgresql', 'CONN_MAX_AGE': 0},
+        'postgres-persistent': {**config, 'ENGINE': 'todocs.db.backends.postgresql', 'CONN_MAX_AGE': 60,
+                                'CONN_HEALTH_CHECKS': True},
+    }
+
+
+def per_request_ms(connection, persistent):
+    # One trivial query per simulated request; without persistence every request reconnects.
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not persistent:
+            connection.close()
+    return (time.perf_counter() - started) * 1000 / ROUNDS
+
+
+def commit_ms(connection):
+    started = time.perf_counter()
+    for number in range(ROUNDS):
+        with connection.cursor() as cursor:
+            cursor.execute('INSERT INTO bench (value) VALUES (%s)', [f'row {number}'])
+    return (time.perf_counter() - started) * 1000 / ROUNDS
+
+
+def reads_during_writes(handler):
+    # Reads completed by one connection while another commits continuously.
+    reader = handler.create_connection('default')
+    stop, reads, locked, writes = threading.Event(), 0, 0, []
+
+    def write():
+        writer = handler.create_connection('default')
+        while not stop.is_set():
+            with writer.cursor() as cursor:
+                cursor.execute('INSERT INTO bench (value) VALUES (%s)', ['concurrent'])
+            writes.append(1)
+        writer.close()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    deadline = time.perf_counter() + WINDOW
+    while time.perf_counter() < deadline:
+        try:
+            with reader.cursor() as cursor:
+                cursor.execute('SELECT COUNT(*) FROM bench')
+            reads += 1
+        except OperationalError:
+            locked += 1
+    stop.set()
+    thread.join()
+    reader.close()
+    return reads, locked, len(writes)
+
+
+def measure(settings_dict, create_table):
+    handler = ConnectionHandler({'default': settings_dict})
+    connection = handler['default']
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS bench')
+        cursor.execute(create_table)
+
+    measured = {
+        'request (reconnect) ms': per_request_ms(connection, persistent=False),
+        'request (persistent) ms': per_request_ms(connection, persistent=True),
+        'commit ms': commit_ms(connection),
+    }
+    connection.close()
+
+    reads, locked, writes = reads_during_writes(handler)
+    measured['reads during writes /s'] = reads / WINDOW
+    measured['concurrent writes /s'] = writes / WINDOW
+    measured['locked reads'] = locked
+    return measured
+
+
+@pytest.mark.parametrize('backend', ['sqlite', 'postgres'])
+def test_database_profiles(backend, tmp_path, database_results, django_db_blocker):
+    if backend == 'sqlite':
+        profiles, create_table = sqlite_profiles(tmp_path), 'CREATE TABLE bench (id INTEGER PRIMARY KEY, value TEXT)'
+    else:
+        profiles, create_table = postgres_profiles(), 'CREATE TABLE bench (id SERIAL PRIMARY KEY, value TEXT)'
+    if not profiles:
+        pytest.skip('set BENCHMARK_POSTGRES_URL to benchmark PostgreSQL')
+
+    measured = {}
+    with django_db_blocker.unblock():
+        for profile, settings_dict in profiles.items():
+            measured[profile] = measure(settings_dict, create_table)
+            for workload, value in measured[profile].items():
+                database_results.append((profile, workload, f'{value:.3f}' if isinstance(value, float) else value))
+
+    if backend == 'sqlite':
+        # WAL readers never wait for the writer.
+        assert measured['sqlite-tuned']['locked reads'] == 0
+        assert measured['sqlite-tuned']['reads during writes /s'] > 0
+    else:
+        assert measured['postgres-persistent']['request (persistent) ms'] < \
+            measured['postgres-per-request']['request (reconnect) ms']
@@ -0,0 +1,200 @@
+import itertools
+import statistics
+import time
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from docs.models import Attachment, Document
+from projects.models import Collaboration, Perms, Project
+from projects.project_creator import ProjectCreator
+from projects.project_exporter import ProjectExporter
+from users.models import User
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+# Absolute headroom on top of the relative tolerance, so millisecond endpoints do not fail on timer noise.
+SLACK_MS = 5
+
+# name, method, path, payload. Paths and string payload values are filled from the `targets` fixture and the
+# endpoint's PREPARE step; a callable payload builds the request data from the same placeholders.
+# Not measured: the second of each PUT/PATCH pair (same view code), the API root, and the auth/ login views.
+ENDPOINTS = [
+    ('projects-list', 'get', '/api/v1/projects/', None),
+    ('projects-list-sparse', 'get', '/api/v1/projects/?fields=pk,name', None),
+    ('projects-detail', 'get', '/api/v1/projects/{project}/', None),
+    ('projects-create', 'post', '/api/v1/projects/', {'name': 'Benchmark'}),
+    ('projects-update', 'patch', '/api/v1/projects/{project}/', {'name': 'Renamed'}),
+    ('projects-destroy', 'delete', '/api/v1/projects/{fresh_project}/', None),
+    ('projects-export', 'get', '/api/v1/projects/{project}/export/', None),
+    ('projects-import', 'post', '/api/v1/projects/import/',
+     lambda placeholders: {'archive': SimpleUploadedFile('export.zip', placeholders['archive'])}),
+    ('collaborations-list', 'get', '/api/v1/collaborations/', None),
+    ('collaborations-detail', 'get', '/api/v1/collaborations/{collaboration}/', None),
+    ('collaborations-create', 'post', '/api/v1/collaborations/',
+     {'project': '{project}', 'user': '{fresh_user}', 'access_level': Perms.EDIT}),
+    ('collaborations-update', 'put', '/api/v1/collaborations/{member}/', {'access_level': Perms.READ_ONLY}),
+    ('collaborations-destroy', 'delete', '/api/v1/collaborations/{fresh_collaboration}/', None),
+    ('collaborations-transfer-ownership', 'put', '/api/v1/collaborations/{fresh_collaboration}/transfer_ownership/',
+     {'demote_to': Perms.EDIT}),
+    ('collaborations-bulk', 'post', '/api/v1/collaborations/bulk/', lambda placeholders: {
+        'project': placeholders['project'],
+        'collaborators': [{'user': user, 'access_level': Perms.READ_ONLY} for user in placeholders['fresh_users']],
+    }),
+    ('users-list', 'get', '/api/v1/users/', None),
+    ('users-detail', 'get', '/api/v1/users/{user}/', None),
+    ('users-create', 'post', '/api/v1/users/', {'email': 'created{sequence}@bench.local', 'password': 'benchmark'}),
+    ('users-update', 'patch', '/api/v1/users/{user}/', {'first_name': 'Renamed'}),
+    ('users-destroy', 'delete', '/api/v1/users/{fresh_user}/', None),
+    ('documents-list', 'get', '/api/v1/projects/{project}/documents/', None),
+    ('documents-list-text', 'get', '/api/v1/projects/{project}/documents/?expand=text', None),
+    ('documents-detail', 'get', '/api/v1/projects/{project}/documents/{document}/?expand=rendered', None),
+    ('documents-create', 'post', '/api/v1/projects/{project}/documents/',
+     {'type': 'MD', 'text': '# Benchmark', 'project': '{project}'}),
+    ('documents-update', 'patch', '/api/v1/projects/{project}/documents/{document}/', {'text': 'Benchmark'}),
+    ('documents-destroy', 'delete', '/api/v1/projects/{project}/documents/{fresh_document}/', None),
+    ('documents-revisions', 'get', '/api/v1/projects/{project}/documents/{document}/revisions/', None),
+    ('documents-revision', 'get', '/api/v1/projects/{project}/documents/{document}/revisions/1/', None),
+    ('documents-search', 'get', '/api/v1/projects/{project}/documents/search/?q=document', None),
+    ('attachments-list', 'get', '/api/v1/projects/{project}/attachments/', None),
+    ('attachments-detail', 'get', '/api/v1/projects/{project}/attachments/{attachment}/', None),
+    ('attachments-upload', 'post', '/api/v1/projects/{project}/attachments/', lambda placeholders: {
+        'file': SimpleUploadedFile('upload.txt', f'upload {placeholders["sequence"]}'.encode()),
+        'project': placeholders['project'],
+    }),
+    ('attachments-update', 'patch', '/api/v1/projects/{project}/attachments/{fresh_attachment}/',
+     lambda placeholders: {'file': SimpleUploadedFile('update.txt', f'update {placeholders["sequence"]}'.encode())}),
+    ('attachments-destroy', 'delete', '/api/v1/projects/{project}/attachments/{fresh_attachment}/', None),
+    ('attachments-download', 'get', '/api/v1/projects/{project}/attachments/{attachment}/download/', None),
+    ('async-attachments-upload', 'post', '/api/v1/async/projects/{project}/attachments/', lambda placeholders: {
+        'file': SimpleUploadedFile('async.txt', f'async {placeholders["sequence"]}'.encode()),
+    }),
+    ('async-attachments-download', 'get', '/api/v1/async/projects/{project}/attachments/{attachment}/download/',
+     None),
+]
+
+# Reads served by ConditionalGetMixin, measured again once their rendered response is cached.
+CACHED_ENDPOINTS = [endpoint for endpoint in ENDPOINTS if endpoint[0] in {
+    'projects-list', 'projects-list-sparse', 'projects-detail', 'collaborations-list', 'collaborations-detail',
+    'documents-list', 'documents-list-text', 'documents-detail', 'attachments-list', 'attachments-detail',
+}]
+
+sequence = itertools.count()
+
+
+def fresh_user(targets):
+    return User.objects.create(email=f'fresh{next(sequence)}@bench.local').pk
+
+
+def fresh_collaboration(targets):
+    # In a project of its own, so a transfer of ownership does not take the benchmark project from its owner.
+    project = ProjectCreator('Fresh', targets['owner'])().instance
+    return Collaboration.objects.create(project=project, user_id=fresh_user(targets), access_level=Perms.EDIT).pk
+
+
+def fresh_attachment(targets):
+    attachment = Attachment.objects.get(pk=targets['attachment'])
+    return Attachment.objects.create(project_id=targets['project'], file=attachment.file.name,
+                                     file_name=attachment.file_name).pk
+
+
+# Objects a write endpoint consumes, created before each request and outside its timing.
+PREPARE = {
+    'projects-destroy': lambda targets: {'fresh_project': ProjectCreator('Fresh', targets['owner'])().instance.pk},
+    'collaborations-create': lambda targets: {'fresh_user': fresh_user(targets)},
+    'collaborations-destroy': lambda targets: {'fresh_collaboration': fresh_collaboration(targets)},
+    'collaborations-transfer-ownership': lambda targets: {'fresh_collaboration': fresh_collaboration(targets)},
+    'collaborations-bulk': lambda targets: {'fresh_users': [fresh_user(targets) for _ in range(10)]},
+    'users-destroy': lambda targets: {'fresh_user': fresh_user(targets)},
+    'documents-destroy': lambda targets: {
+        'fresh_document': Document.objects.create(project_id=targets['project'], type='MD', text='Fresh').pk},
+    'attachments-update': lambda targets: {'fresh_attachment': fresh_attachment(targets)},
+    'attachments-destroy': lambda targets: {'fresh_attachment': fresh_attachment(targets)},
+}
+
+MULTIPART = {'projects-import', 'attachments-upload', 'attachments-update', 'async-attachments-upload'}
+
+
+@pytest.fixture(scope='module')
+def targets(benchmark_data, django_db_blocker):
+    with django_db_blocker.unblock():
+        owner = Collaboration.objects.filter(access_level=Perms.OWNER).order_by('pk').select_related('user').first()
+        document = Document.objects.filter(project=owner.project_id, revisions__isnull=False).first()
+        member = Collaboration.objects.filter(project=owner.project_id).exclude(access_level=Perms.OWNER).first()
+        return {
+            'owner': owner.user,
+            'project': owner.project_id,
+            'collaboration': owner.pk,
+            'member': member.pk,
+            'user': User.objects.order_by('-pk').values_list('pk', flat=True).first(),
+            'document': document.pk,
+            'attachment': Attachment.objects.filter(project=owner.project_id).values_list('pk', flat=True).first(),
+            'archive': b''.join(ProjectExporter(Project.objects.get(pk=owner.project_id))()),
+        }
+
+
+def consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+@pytest.mark.parametrize('name, method, path, payload', ENDPOINTS, ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_endpoint_budget(name, method, path, payload, targets, baselines, benchmark_results, request, settings):
+    # Every round after the first would be a response cache hit and hide the queries and serializers behind it.
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+    measure(name, method, path, payload, targets, baselines, benchmark_results, request)
+
+
+@pytest.mark.parametrize('name, method, path, payload', CACHED_ENDPOINTS,
+                         ids=[endpoint[0] for endpoint in CACHED_ENDPOINTS])
+def test_cached_endpoint_budget(name, method, path, payload, targets, baselines, benchmark_results, request):
+    measure(f'{name}-cached', method, path, payload, targets, baselines, benchmark_results, request)
+
+
+def measure(name, method, path, payload, targets, baselines, benchmark_results, request):
+    api = APIClient()
+    api.force_authenticate(user=targets['owner'])
+    prepare = PREPARE.get(name, lambda targets: {})
+
+    def build():
+        placeholders = {**targets, **prepare(targets), 'sequence': next(sequence)}
+        if callable(payload):
+            data = payload(placeholders)
+        else:
+            data = {key: value.format(**placeholders) for key, value in payload.items()} if payload else None
+        return path.format(**placeholders), data
+
+    def call(url, data):
+        request_format = 'multipart' if name in MULTIPART else 'json' if data else None
+        return consume(getattr(api, method)(url, data, format=request_format))
+
+    assert call(*build()).status_code < 400, f'{name} failed before measuring'
+
+    timings = []
+    for round_number in range(request.config.getoption('--benchmark-rounds')):
+        url, data = build()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            call(url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        if round_number == 0:
+            queries = len(captured)
+
+    measured = {'queries': queries, 'ms': round(statistics.median(timings), 2)}
+    benchmark_results[name] = measured
+
+    if request.config.getoption('--benchmark-update'):
+        return
+    if name not in baselines:
+        pytest.fail(f'No baseline for {name}, record one with --benchmark-update')
+
+    baseline = baselines[name]
+    assert measured['queries'] <= baseline['queries'], \
+        f'{name} ran {measured["queries"]} queries, budget is {baseline["queries"]}'
+    if baseline['ms'] is not None:
+        budget = baseline['ms'] * request.config.getoption('--benchmark-tolerance') + SLACK_MS
+        assert measured['ms'] <= budget, f'{name} took {measured["ms"]:.2f} ms, budget is {budget:.2f} ms'
@@ -0,0 +1,63 @@
+import statistics
+import time
+
+import pytest
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from docs.models import Document
+from docs.serializer import DocumentSerializer, DocumentSummarySerializer
+from projects.models import Collaboration
+from projects.serializer import CollaborationSerializer
+from todocs.projections import Projection
+from todocs.renderers import ORJSONRenderer
+from users.models import User
+from users.serializer import UserSerializer
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+ROWS = 10000
+
+# name, queryset factory, serializer class, serializer kwargs
+LISTINGS = [
+    ('documents-summary', lambda: Document.objects.summaries().order_by('created', 'pk'), DocumentSummarySerializer, {}),
+    ('documents-text', lambda: Document.objects.order_by('created', 'pk'), DocumentSerializer, {'expand': ['text']}),
+    ('collaborations', lambda: Collaboration.objects.order_by('pk'), CollaborationSerializer, {}),
+    ('users', lambda: User.objects.order_by('pk'), UserSerializer, {}),
+]
+
+
+def timed(funcs, rounds):
+    # Rounds alternate between the functions, so drift during the run weighs on each of them alike.
+    timings, results = [[] for _ in funcs], [None] * len(funcs)
+    for _ in range(rounds):
+        for index, func in enumerate(funcs):
+            started = time.perf_counter()
+            results[index] = func()
+            timings[index].append((time.perf_counter() - started) * 1000)
+    return [(result, statistics.median(timing)) for result, timing in zip(results, timings)]
+
+
+@pytest.mark.parametrize('name, queryset, serializer_class, kwargs', LISTINGS, ids=[listing[0] for listing in LISTINGS])
+def test_projection_beats_serializer(name, queryset, serializer_class, kwargs, benchmark_data, serialization_results,
+                                     request):
+    # Both sides include fetching the rows; the projection side is what ValuesListMixin.list does.
+    rows = queryset()[:ROWS]
+    rounds = request.config.getoption('--benchmark-rounds')
+
+    def serialize():
+        return JSONRenderer().render(serializer_class(rows, many=True, **kwargs).data)
+
+    def project():
+        projection = Projection.for_serializer(serializer_class(**kwargs), rows)
+        response = Response(projection.render(projection.values(rows)))
+        response.float_free = not projection.floats
+        return ORJSONRenderer().render(response.data, None, {'response': response})
+
+    (expected, serializer_ms), (content, projection_ms) = timed([serialize, project], rounds)
+    serialization_results.append((name, len(rows), serializer_ms, projection_ms))
+
+    assert content == expected
+    # Listings dominated by fetching rows (documents-text) gain little, so a strict comparison of two noisy
+    # medians would flip; the projection fails only when it falls behind by more than the tolerance.
+    budget = serializer_ms * request.config.getoption('--benchmark-tolerance')
+    assert projection_ms <= budget, f'{name} projection took {projection_ms:.2f} ms, budget is {budget:.2f} ms'
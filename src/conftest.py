@@ -0,0 +1,58 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from docs.models import fs
+from todocs.projections import Projection
+from todocs.renderers import ORJSONRenderer
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _attachments_root(tmp_path_factory):
+    # Attachment files written by tests land in a temporary directory, never in ATTACHMENTS_ROOT. Session-scoped so
+    # files seeded once for the benchmarks stay readable.
+    root = tmp_path_factory.mktemp('attachments')
+    with pytest.MonkeyPatch.context() as patched:
+        patched.setattr(fs, 'base_location', str(root))
+        patched.setattr(fs, 'location', str(root))
+        yield root
+
+
+@pytest.fixture
+def reference_content(monkeypatch, settings):
+    # Fetches a URL the way DRF alone would serve it: serializers and the stock JSONRenderer, no response cache.
+    settings.RESPONSE_CACHE_TIMEOUT = 0
+
+    def fetch(api, url):
+        with monkeypatch.context() as patched:
+            patched.setattr(Projection, 'for_serializer', classmethod(lambda cls, serializer, queryset: None))
+            patched.setattr(ORJSONRenderer, 'render', JSONRenderer.render)
+            return api.get(url).content
+    return fetch
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmark')
+    group.addoption('--benchmark', action='store_true', help='Run the endpoint benchmarks in benchmarks/')
+    group.addoption('--benchmark-scale', type=float, default=1.0,
+                    help='Multiplier for the seeded data volume (1.0 = 10k projects, 100k collaborations and documents)')
+    group.addoption('--benchmark-rounds', type=int, default=3, help='Timed requests per endpoint')
+    group.addoption('--benchmark-tolerance', type=float, default=1.5,
+                    help='Allowed slowdown over the stored latency baseline')
+    group.addoption('--benchmark-update', action='store_true', help='Rewrite baselines.json from this run')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+
+    skip = pytest.mark.skip(reason='benchmarks only run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,44 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from docs.attachment_creator import AttachmentCreator
+from docs.attachment_downloader import AttachmentDownloader
+from docs.models import Attachment
+from todocs.streaming import AsyncFileResponse
+
+# Async counterparts of AttachmentViewset.create and .download for the ASGI application.
+# Blocking file work runs in worker threads, ORM calls in the thread-sensitive executor.
+# Django 3.2's view decorators are sync-only, so methods and CSRF exemption are handled here.
+
+
+class AsyncAttachmentDownloader(AttachmentDownloader):
+    response_class = AsyncFileResponse
+
+
+async def upload_attachment(request, project_pk):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    # The ASGI handler has already spooled the body; parsing it still touches disk.
+    files, data = await sync_to_async(lambda: (request.FILES, request.POST), thread_sensitive=False)()
+    if 'file' not in files:
+        return JsonResponse({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        serializer = await sync_to_async(AttachmentCreator(files['file'], data.get('project', project_pk)))()
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(serializer.data, status=status.HTTP_201_CREATED)
+
+
+upload_attachment.csrf_exempt = True
+
+
+async def download_attachment(request, project_pk, pk):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    attachment = await sync_to_async(get_object_or_404)(Attachment, project=project_pk, pk=pk)
+    return await sync_to_async(AsyncAttachmentDownloader(attachment, request), thread_sensitive=False)()
@@ -1,8 +1,12 @@
+from django.db import transaction
+from docs.models import Blob
 from docs.serializer import AttachmentSerializer
+from docs.storage import content_hash
 
 
 class AttachmentCreator:
     def __init__(self, file, project):
+        self.file = file
         self.data = {
             'file': file,
             'file_name': str(file.name),
@@ -13,5 +17,12 @@ class AttachmentCreator:
         serializer = AttachmentSerializer(data=self.data)
         serializer.is_valid(raise_exception=True)
 
-        serializer.save()
+        with transaction.atomic():
+            # The lock lasts until the new reference is counted, so collect() can not remove the blob in between.
+            blob = Blob.objects.select_for_update().filter(hash=content_hash(self.file)).first()
+            if blob is not None:
+                # Identical content is already stored, point at it instead of writing it again.
+                serializer.save(file=blob.name)
+            else:
+                serializer.save()
         return serializer
@@ -0,0 +1,126 @@
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from docs.storage import hash_from_name
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+OFFLOAD_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+
+
+class RangeFile:
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+class AttachmentDownloader:
+    response_class = FileResponse
+
+    def __init__(self, attachment, request):
+        self.attachment = attachment
+        self.request = request
+        self.etag = f'"{hash_from_name(attachment.file.name)}"'
+
+    def __call__(self):
+        if self.is_not_modified():
+            response = HttpResponseNotModified()
+        elif settings.ATTACHMENT_DOWNLOAD_OFFLOAD:
+            response = self.offloaded_response()
+        else:
+            response = self.file_response()
+
+        response['ETag'] = self.etag
+        return response
+
+    def is_not_modified(self):
+        etags = parse_etags(self.request.META.get('HTTP_IF_NONE_MATCH', ''))
+        return '*' in etags or self.etag in etags
+
+    def offloaded_response(self):
+        # The front proxy serves the bytes (and Range requests) from the internal location.
+        content_type, encoding = mimetypes.guess_type(self.attachment.file_name)
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        response['Content-Disposition'] = f'attachment; {self.disposition_filename()}'
+        header = OFFLOAD_HEADERS[settings.ATTACHMENT_DOWNLOAD_OFFLOAD]
+        if header == 'X-Sendfile':
+            response[header] = self.attachment.file.path
+        else:
+            response[header] = settings.ATTACHMENT_DOWNLOAD_PREFIX + self.attachment.file.name
+        return response
+
+    def disposition_filename(self):
+        file_name = self.attachment.file_name
+        try:
+            file_name.encode('ascii')
+        except UnicodeEncodeError:
+            return f"filename*=utf-8''{quote(file_name)}"
+        escaped = file_name.replace('\\', '\\\\').replace('"', '\\"')
+        return f'filename="{escaped}"'
+
+    def file_response(self):
+        size = self.attachment.file.size
+        byte_range = self.requested_range(size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = self.attachment.file.storage.open(self.attachment.file.name, 'rb')
+        if byte_range is None:
+            response = self.response_class(file, as_attachment=True, filename=self.attachment.file_name)
+        else:
+            start, end = byte_range
+            response = self.response_class(RangeFile(file, start, end - start + 1), status=206,
+                                           as_attachment=True, filename=self.attachment.file_name)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    def requested_range(self, size):
+        # None serves the whole file, False means the range can not be satisfied.
+        header = self.request.META.get('HTTP_RANGE')
+        if not header:
+            return None
+
+        if_range = self.request.META.get('HTTP_IF_RANGE')
+        if if_range and if_range != self.etag:
+            return None
+
+        match = RANGE_RE.match(header.strip())
+        if match is None:
+            # Malformed or multi-range requests fall back to the full body.
+            return None
+
+        start, end = match.groups()
+        if not start:
+            if not end or int(end) == 0:
+                return False
+            return max(size - int(end), 0), size - 1
+
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+        if start >= size or start > end:
+            return False
+        return start, end
@@ -0,0 +1,99 @@
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+
+class TextEncoding(models.TextChoices):
+    PLAIN = 'plain'
+    ZLIB = 'zlib'
+
+
+def compress_text(text):
+    data = (text or '').encode('utf-8')
+    if len(data) < settings.DOCUMENT_COMPRESSION_THRESHOLD:
+        return TextEncoding.PLAIN, None
+
+    compressed = zlib.compress(data, settings.DOCUMENT_COMPRESSION_LEVEL)
+    if len(compressed) >= len(data):
+        return TextEncoding.PLAIN, None
+    return TextEncoding.ZLIB, compressed
+
+
+def text_head(text):
+    return (text or '')[:settings.DOCUMENT_PREVIEW_LENGTH]
+
+
+def decompress_text(encoding, payload):
+    if encoding == TextEncoding.ZLIB:
+        return zlib.decompress(payload).decode('utf-8')
+    raise ValueError(f'Unknown text encoding: {encoding}')
+
+
+class CompressedTextDescriptor(DeferredAttribute):
+    # A data descriptor, so it is consulted even once the column value sits in __dict__.
+    # For compressed rows the column only holds the head of the text until it is decompressed.
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+
+        field = self.field
+        data = instance.__dict__
+        if field.attname not in data:
+            instance.refresh_from_db(fields=[field.attname, field.encoding_attname, field.compressed_attname])
+
+        if not data.get(field.loaded_attname) and getattr(instance, field.encoding_attname) != TextEncoding.PLAIN:
+            data[field.attname] = decompress_text(getattr(instance, field.encoding_attname),
+                                                  getattr(instance, field.compressed_attname))
+            data[field.loaded_attname] = True
+        return data[field.attname]
+
+    def __set__(self, instance, value):
+        # Values assigned while a row is being loaded are raw column values; later assignments are the full text.
+        instance.__dict__[self.field.attname] = value
+        instance.__dict__[self.field.loaded_attname] = not instance._state.adding
+
+
+class CompressedTextField(models.TextField):
+    # Large values live compressed in `<name>_compressed`, flagged by `<name>_encoding`, with their
+    # length in `<name>_size`; the column itself keeps only the head of the text for those rows so
+    # previews can be computed in SQL, and the full text is decompressed on first access.
+    descriptor_class = CompressedTextDescriptor
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('null', True)
+        super().__init__(*args, **kwargs)
+
+    @property
+    def encoding_attname(self):
+        return f'{self.attname}_encoding'
+
+    @property
+    def compressed_attname(self):
+        return f'{self.attname}_compressed'
+
+    @property
+    def size_attname(self):
+        return f'{self.attname}_size'
+
+    @property
+    def loaded_attname(self):
+        return f'_{self.attname}_loaded'
+
+    @property
+    def values_lookups(self):
+        return self.attname, self.encoding_attname, self.compressed_attname
+
+    def from_values(self, row):
+        # Rebuilds the text from a .values() row holding values_lookups.
+        if row[self.encoding_attname] == TextEncoding.PLAIN:
+            return row[self.attname]
+        return decompress_text(row[self.encoding_attname], row[self.compressed_attname])
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if getattr(model_instance, self.encoding_attname) != TextEncoding.PLAIN:
+            return text_head(value)
+        return value
@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models.functions import Length
+from docs.fields import TextEncoding, compress_text, decompress_text, text_head
+from docs.models import Document
+
+
+class Command(BaseCommand):
+    help = 'Compresses stored Document.text bodies above DOCUMENT_COMPRESSION_THRESHOLD in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only measure, do not write')
+
+    def handle(self, *args, **options):
+        # Character length is a lower bound of the UTF-8 size, so nothing eligible is skipped.
+        candidates = Document.objects.filter(text_encoding=TextEncoding.PLAIN)\
+            .annotate(text_length=Length('text'))\
+            .filter(text_length__gte=settings.DOCUMENT_COMPRESSION_THRESHOLD // 4)\
+            .only('pk', 'text', 'text_encoding').order_by('pk')
+
+        compressed = plain_bytes = stored_bytes = 0
+        compress_time = decompress_time = 0.0
+        last_pk = 0
+
+        while True:
+            batch = list(candidates.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            with transaction.atomic():
+                for document in batch:
+                    started = time.perf_counter()
+                    encoding, payload = compress_text(document.text)
+                    compress_time += time.perf_counter() - started
+                    if encoding == TextEncoding.PLAIN:
+                        continue
+
+                    started = time.perf_counter()
+                    decompress_text(encoding, payload)
+                    decompress_time += time.perf_counter() - started
+
+                    compressed += 1
+                    plain_bytes += len(document.text.encode('utf-8'))
+                    stored_bytes += len(payload)
+
+                    if not options['dry_run']:
+                        Document.objects.filter(pk=document.pk, text_encoding=TextEncoding.PLAIN)\
+                            .update(text=text_head(document.text), text_encoding=encoding,
+                                    text_compressed=payload, text_size=len(document.text))
+
+            self.stdout.write(f'Processed documents up to pk {last_pk}')
+
+        if not compressed:
+            self.stdout.write(self.style.SUCCESS('No documents to compress.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Would compress" if options["dry_run"] else "Compressed"} {compressed} documents: '
+            f'{plain_bytes} -> {stored_bytes} bytes ({stored_bytes / plain_bytes:.1%}), '
+            f'compress {compress_time / compressed * 1000:.3f} ms/doc, '
+            f'decompress {decompress_time / compressed * 1000:.3f} ms/doc'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from docs import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index over Document.text'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Full-text search index requires SQLite with FTS5.')
+
+        indexed = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} documents.'))
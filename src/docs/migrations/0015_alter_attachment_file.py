@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:04
+
+from django.db import migrations, models
+import docs.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0014_auto_20201221_1936'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(storage=docs.storage.HashedFileSystemStorage(location='../files'), upload_to=''),
+        ),
+    ]
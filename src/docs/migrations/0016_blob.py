@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:06
+
+import os
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_blobs(apps, schema_editor):
+    Attachment = apps.get_model('docs', 'Attachment')
+    Blob = apps.get_model('docs', 'Blob')
+    storage = Attachment._meta.get_field('file').storage
+
+    blobs = {}
+    for row in Attachment.objects.values('file').annotate(references=Count('pk')).order_by():
+        blob_hash = os.path.splitext(os.path.basename(row['file']))[0]
+        if blob_hash in blobs:
+            blobs[blob_hash].references += row['references']
+            continue
+        try:
+            size = storage.size(row['file'])
+        except OSError:
+            size = 0
+        blobs[blob_hash] = Blob(hash=blob_hash, name=row['file'], size=size, references=row['references'])
+
+    Blob.objects.bulk_create(blobs.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0015_alter_attachment_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('hash', models.CharField(max_length=40, primary_key=True, serialize=False)),
+                ('name', models.TextField()),
+                ('size', models.BigIntegerField()),
+                ('references', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_blobs, migrations.RunPython.noop),
+    ]
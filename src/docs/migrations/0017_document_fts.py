@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    schema_editor.execute('CREATE VIRTUAL TABLE docs_document_fts USING fts5(text, project_id)')
+    schema_editor.execute('INSERT INTO docs_document_fts (rowid, text, project_id) '
+                          'SELECT id, text, CAST(project_id AS TEXT) FROM docs_document')
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS docs_document_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0016_blob'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
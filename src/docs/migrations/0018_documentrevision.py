@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0017_document_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('is_snapshot', models.BooleanField()),
+                ('data', models.TextField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='docs.document')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='documentrevision',
+            constraint=models.UniqueConstraint(fields=('document', 'number'), name='unique document revision'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:10
+
+from django.db import migrations, models
+import docs.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0018_documentrevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='text_compressed',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='text_encoding',
+            field=models.TextField(choices=[('plain', 'Plain'), ('zlib', 'Zlib')], default='plain'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='text',
+            field=docs.fields.CompressedTextField(null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:14
+
+from django.db import migrations, models
+from docs.fields import TextEncoding, decompress_text, text_head
+
+
+def backfill_compressed_heads(apps, schema_editor):
+    Document = apps.get_model('docs', 'Document')
+
+    rows = Document.objects.exclude(text_encoding=TextEncoding.PLAIN)\
+        .values_list('pk', 'text_encoding', 'text_compressed')
+    for pk, encoding, payload in rows.iterator(chunk_size=500):
+        text = decompress_text(encoding, payload)
+        Document.objects.filter(pk=pk).update(text=text_head(text), text_size=len(text))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0019_document_text_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='text_size',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_compressed_heads, migrations.RunPython.noop),
+    ]
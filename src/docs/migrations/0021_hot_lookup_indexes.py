@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('docs', '0020_document_text_size'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(fields=['project', 'created'], name='attachment_project_created'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['project', 'created'], name='document_project_created'),
+        ),
+    ]
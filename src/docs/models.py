@@ -1,8 +1,12 @@
-from django.db import models
-from django_hashedfilenamestorage.storage import HashedFilenameFileSystemStorage
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Length, Substr
+from docs.fields import CompressedTextField, TextEncoding, compress_text
+from docs.storage import HashedFileSystemStorage, hash_from_name
 
 
-fs = HashedFilenameFileSystemStorage(location='../files')
+fs = HashedFileSystemStorage(location=settings.ATTACHMENTS_ROOT)
 
 
 class FileType(models.TextChoices):
@@ -10,11 +14,56 @@ class FileType(models.TextChoices):
     MARKDOWN = 'MD'
 
 
+class DocumentQuerySet(models.QuerySet):
+    def summaries(self):
+        # Size and preview come from SQL; neither the text nor its compressed payload is loaded.
+        return self.defer('text', 'text_compressed').annotate(
+            size=Coalesce('text_size', Length('text'), Value(0)),
+            preview=Coalesce(Substr('text', 1, settings.DOCUMENT_PREVIEW_LENGTH), Value('')),
+        )
+
+
 class Document(models.Model):
     type = models.TextField(choices=FileType.choices)
-    text = models.TextField()
+    text = CompressedTextField()
     project = models.ForeignKey('projects.Project', on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now_add=True)
+    text_encoding = models.TextField(choices=TextEncoding.choices, default=TextEncoding.PLAIN)
+    text_compressed = models.BinaryField(null=True)
+    text_size = models.PositiveIntegerField(null=True)
+
+    objects = DocumentQuerySet.as_manager()
+
+    def prepare_text(self):
+        # Also called directly before bulk_create, which bypasses save().
+        self.text_encoding, self.text_compressed = compress_text(self.text)
+        self.text_size = len(self.text) if self.text_encoding != TextEncoding.PLAIN else None
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if 'text' not in self.get_deferred_fields():
+            self.prepare_text()
+            if update_fields is not None and 'text' in update_fields:
+                update_fields = {*update_fields, 'text_encoding', 'text_compressed', 'text_size'}
+
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created'], name='document_project_created'),
+        ]
+
+
+class DocumentRevision(models.Model):
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField()
+    data = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'number'], name='unique document revision')
+        ]
 
 
 class Attachment(models.Model):
@@ -22,3 +71,51 @@ class Attachment(models.Model):
     file_name = models.TextField(max_length=256)
     project = models.ForeignKey('projects.Project', on_delete=models.CASCADE)
     created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created'], name='attachment_project_created'),
+        ]
+
+
+class BlobManager(models.Manager):
+    def reference(self, name, size):
+        blob_hash = hash_from_name(name)
+        with transaction.atomic():
+            # Holding the row until commit keeps collect() from deleting the blob under this reference.
+            if self.select_for_update().filter(hash=blob_hash).values_list('pk', flat=True).first() is None:
+                self.get_or_create(hash=blob_hash, defaults={'name': name, 'size': size})
+            self.filter(hash=blob_hash).update(references=F('references') + 1)
+
+    def reference_many(self, blobs):
+        # blobs maps stored name -> (size, number of new references).
+        self.bulk_create([Blob(hash=hash_from_name(name), name=name, size=size) for name, (size, _) in blobs.items()],
+                         ignore_conflicts=True)
+
+        by_count = {}
+        for name, (_, count) in blobs.items():
+            by_count.setdefault(count, []).append(hash_from_name(name))
+        for count, hashes in by_count.items():
+            self.filter(hash__in=hashes).update(references=F('references') + count)
+
+    def release(self, name):
+        blob_hash = hash_from_name(name)
+        self.filter(hash=blob_hash).update(references=F('references') - 1)
+        transaction.on_commit(lambda: self.collect(blob_hash))
+
+    def collect(self, blob_hash):
+        with transaction.atomic():
+            blob = self.select_for_update().filter(hash=blob_hash).first()
+            # Re-checked under the lock: a reference taken since the release keeps the blob and its file.
+            if blob is not None and blob.references <= 0:
+                blob.delete()
+                fs.delete(blob.name)
+
+
+class Blob(models.Model):
+    hash = models.CharField(max_length=40, primary_key=True)
+    name = models.TextField()
+    size = models.BigIntegerField()
+    references = models.IntegerField(default=0)
+
+    objects = BlobManager()
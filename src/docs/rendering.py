@@ -0,0 +1,85 @@
+import hashlib
+import html
+import re
+import threading
+from collections import OrderedDict
+
+import markdown
+from django.conf import settings
+from markdown.treeprocessors import Treeprocessor
+
+SAFE_URL_SCHEMES = {'http', 'https', 'mailto'}
+URL_SCHEME = re.compile(r'^([a-z][a-z0-9+.-]*):', re.IGNORECASE)
+# Browsers ignore these anywhere in a URL, so 'java\tscript:' still runs.
+IGNORED_URL_CHARACTERS = re.compile(r'[\x00-\x20\x7f]')
+
+
+class LRURenderCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        cost = len(value.encode('utf-8'))
+        if cost > self.max_bytes:
+            return
+
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+
+            self.entries[key] = (value, cost)
+            self.size += cost
+            while self.size > self.max_bytes:
+                _, (_, evicted_cost) = self.entries.popitem(last=False)
+                self.size -= evicted_cost
+
+
+render_cache = LRURenderCache(settings.MARKDOWN_RENDER_CACHE_MAX_BYTES)
+
+
+def is_safe_url(url):
+    # Relative URLs and the SAFE_URL_SCHEMES; entities are decoded first, as the browser would.
+    match = URL_SCHEME.match(IGNORED_URL_CHARACTERS.sub('', html.unescape(url)))
+    return match is None or match.group(1).lower() in SAFE_URL_SCHEMES
+
+
+class SafeURLTreeprocessor(Treeprocessor):
+    # Runs after inline patterns have turned links and images into elements.
+    def run(self, root):
+        for element in root.iter():
+            for attribute in ('href', 'src'):
+                url = element.get(attribute)
+                if url is not None and not is_safe_url(url):
+                    del element.attrib[attribute]
+
+
+def _to_html(text):
+    converter = markdown.Markdown(extensions=['fenced_code', 'tables'])
+    # Raw HTML in documents is escaped instead of passed through, and so are link and image URLs like javascript:.
+    converter.preprocessors.deregister('html_block')
+    converter.inlinePatterns.deregister('html')
+    converter.treeprocessors.register(SafeURLTreeprocessor(converter), 'safe_urls', 1)
+    return converter.convert(text)
+
+
+def render_markdown(text):
+    key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    rendered = render_cache.get(key)
+    if rendered is None:
+        rendered = _to_html(text)
+        render_cache.set(key, rendered)
+    return rendered
@@ -0,0 +1,97 @@
+import json
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import Max
+from docs.models import Document, DocumentRevision
+
+# A full snapshot is stored at least every SNAPSHOT_INTERVAL revisions, which
+# bounds how many deltas have to be replayed to rebuild any version.
+SNAPSHOT_INTERVAL = 20
+
+
+def make_delta(old_text, new_text):
+    # Positive ints copy lines from the old text, negative ints skip them, strings are inserted.
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old_lines, new_lines).get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(old_text, ops):
+    old_lines = old_text.splitlines(keepends=True)
+
+    position, parts = 0, []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.extend(old_lines[position:position + op])
+            position += op
+        else:
+            position -= op
+    return ''.join(parts)
+
+
+def revision_chain(document, number):
+    snapshot = document.revisions.filter(number__lte=number, is_snapshot=True).aggregate(number=Max('number'))
+    if snapshot['number'] is None:
+        raise DocumentRevision.DoesNotExist
+    return list(document.revisions.filter(number__gte=snapshot['number'], number__lte=number).order_by('number'))
+
+
+def replay(chain):
+    text = chain[0].data
+    for revision in chain[1:]:
+        text = apply_delta(text, json.loads(revision.data))
+    return text
+
+
+def get_revision_text(document, number):
+    chain = revision_chain(document, number)
+    if chain[-1].number != number:
+        raise DocumentRevision.DoesNotExist
+    return replay(chain)
+
+
+def record_revision(document):
+    with transaction.atomic():
+        # Saves of one document queue on its row, so each numbers its revision after the last one committed.
+        Document.objects.select_for_update().filter(pk=document.pk).values_list('pk', flat=True).first()
+        return _append_revision(document)
+
+
+def record_base_revision(document):
+    # Documents saved before revisions were kept have none; their stored text becomes revision 1 before an edit.
+    with transaction.atomic():
+        Document.objects.select_for_update().filter(pk=document.pk).values_list('pk', flat=True).first()
+        if not document.revisions.exists():
+            _append_revision(Document.objects.get(pk=document.pk))
+
+
+def _append_revision(document):
+    latest = document.revisions.order_by('-number').first()
+    if latest is None:
+        return DocumentRevision.objects.create(document=document, number=1, is_snapshot=True, data=document.text)
+
+    chain = revision_chain(document, latest.number)
+    previous_text = replay(chain)
+    if previous_text == document.text:
+        return latest
+
+    number = latest.number + 1
+    if len(chain) < SNAPSHOT_INTERVAL:
+        delta = json.dumps(make_delta(previous_text, document.text), ensure_ascii=False, separators=(',', ':'))
+        if len(delta) < len(document.text):
+            return DocumentRevision.objects.create(document=document, number=number, is_snapshot=False, data=delta)
+
+    return DocumentRevision.objects.create(document=document, number=number, is_snapshot=True, data=document.text)
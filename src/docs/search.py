@@ -0,0 +1,111 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from docs.fields import TextEncoding, decompress_text
+from docs.models import Document
+
+FTS_TABLE = 'docs_document_fts'
+TOKEN_RE = re.compile(r'(\w+)(\*?)')
+# Private use characters stand in for the highlight tags until the snippet text is escaped.
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def index_documents(documents):
+    if not is_supported():
+        return
+
+    rows = [(document.pk, document.text, str(document.project_id)) for document in documents]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, text, project_id) VALUES (%s, %s, %s)', rows)
+
+
+def unindex_documents(document_ids):
+    if not is_supported():
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in document_ids])
+
+
+def rebuild_index(batch_size=1000):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    return index_queryset(Document.objects.all(), batch_size)
+
+
+def index_queryset(documents, batch_size=1000):
+    if not is_supported():
+        return 0
+
+    indexed, batch = 0, []
+    documents = documents.only('pk', 'project_id', 'text', 'text_encoding', 'text_compressed')
+    for document in documents.iterator(chunk_size=batch_size):
+        batch.append(document)
+        if len(batch) == batch_size:
+            index_documents(batch)
+            indexed, batch = indexed + len(batch), []
+
+    index_documents(batch)
+    return indexed + len(batch)
+
+
+def build_match_expression(project_id, query):
+    terms = [f'"{word}"{prefix}' for word, prefix in TOKEN_RE.findall(query)]
+    if not terms:
+        return None
+    return f'project_id:"{int(project_id)}" AND text:({" ".join(terms)})'
+
+
+def search_unindexed(project_id, query, limit, offset):
+    # Rows are matched in SQL, compressed ones on the preview kept in their text column. The newest
+    # DOCUMENT_SEARCH_DECOMPRESS_LIMIT compressed rows are also decompressed and matched here, which bounds the
+    # per-query cost; older compressed documents only match on their preview.
+    documents = Document.objects.filter(project=project_id)
+    matches = dict(documents.filter(text__icontains=query).values_list('pk', 'created'))
+
+    needle = query.lower()
+    compressed = documents.exclude(text_encoding=TextEncoding.PLAIN).order_by('-created', '-pk')\
+        .values_list('pk', 'created', 'text_encoding', 'text_compressed')[:settings.DOCUMENT_SEARCH_DECOMPRESS_LIMIT]
+    for pk, created, encoding, payload in compressed.iterator(chunk_size=100):
+        if pk not in matches and needle in decompress_text(encoding, payload).lower():
+            matches[pk] = created
+
+    ordered = sorted(matches.items(), key=lambda match: (match[1], match[0]), reverse=True)
+    pks = [pk for pk, _ in ordered[offset:offset + limit]]
+    found = documents.defer('text', 'text_compressed').in_bulk(pks)
+    return [found[pk] for pk in pks]
+
+
+def highlight(snippet):
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_documents(project_id, query, limit=20, offset=0):
+    if not is_supported():
+        return search_unindexed(project_id, query, limit, offset)
+
+    match = build_match_expression(project_id, query)
+    if match is None:
+        return Document.objects.none()
+
+    # Weight 0.0 keeps the project filter column out of the bm25 score.
+    return Document.objects.raw(
+        f'''
+        SELECT d.id, d.type, d.project_id, d.created,
+               snippet({FTS_TABLE}, 0, %s, %s, '…', 16) AS snippet,
+               bm25({FTS_TABLE}, 1.0, 0.0) AS rank
+        FROM {FTS_TABLE}
+        JOIN docs_document d ON d.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY rank
+        LIMIT %s OFFSET %s
+        ''',
+        [MARK_START, MARK_END, match, limit, offset],
+    )
@@ -1,11 +1,36 @@
 from rest_framework import serializers
-from docs.models import Document, Attachment
+from docs.models import Document, Attachment, DocumentRevision, FileType
+from docs.rendering import render_markdown
+from docs.search import highlight
 
 
 class DocumentSerializer(serializers.ModelSerializer):
+    rendered = serializers.SerializerMethodField()
+
     class Meta:
         model = Document
-        fields = '__all__'
+        exclude = ['text_encoding', 'text_compressed', 'text_size']
+        extra_kwargs = {'text': {'required': True, 'allow_null': False}}
+
+    def __init__(self, *args, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if 'rendered' not in expand:
+            self.fields.pop('rendered')
+
+    def get_rendered(self, document):
+        if document.type != FileType.MARKDOWN:
+            return None
+        return render_markdown(document.text)
+
+
+class DocumentSummarySerializer(serializers.ModelSerializer):
+    size = serializers.IntegerField(read_only=True)
+    preview = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Document
+        fields = ['id', 'type', 'project', 'created', 'size', 'preview']
 
 
 class AttachmentSerializer(serializers.ModelSerializer):
@@ -13,3 +38,29 @@ class AttachmentSerializer(serializers.ModelSerializer):
         model = Attachment
         fields = '__all__'
         read_only_fields = ['created']
+
+
+class DocumentSearchResultSerializer(serializers.ModelSerializer):
+    snippet = serializers.SerializerMethodField()
+    rank = serializers.FloatField(read_only=True, default=None)
+
+    class Meta:
+        model = Document
+        fields = ['id', 'type', 'project', 'created', 'snippet', 'rank']
+
+    def get_snippet(self, document):
+        # Document text is escaped; only the highlight marks are markup.
+        snippet = getattr(document, 'snippet', None)
+        return None if snippet is None else highlight(snippet)
+
+
+class DocumentSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField()
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    offset = serializers.IntegerField(min_value=0, default=0)
+
+
+class DocumentRevisionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DocumentRevision
+        fields = ['number', 'is_snapshot', 'created']
@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from docs import search
+from docs.models import Attachment, Blob, Document
+from todocs.generations import bump_generations, project_scope
+
+
+@receiver(pre_save, sender=Attachment)
+def remember_attachment_blob(sender, instance, **kwargs):
+    instance.previous_file_name = None
+    if not instance._state.adding:
+        instance.previous_file_name = sender.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+@receiver(post_save, sender=Attachment)
+def reference_attachment_blob(sender, instance, created, **kwargs):
+    if created:
+        Blob.objects.reference(instance.file.name, instance.file.size)
+    elif instance.previous_file_name is not None and instance.previous_file_name != instance.file.name:
+        # The file was replaced: the new blob gains the reference the old one gives up.
+        with transaction.atomic():
+            Blob.objects.reference(instance.file.name, instance.file.size)
+            Blob.objects.release(instance.previous_file_name)
+
+
+@receiver(post_delete, sender=Attachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    Blob.objects.release(instance.file.name)
+
+
+@receiver(post_save, sender=Document)
+def index_document(sender, instance, **kwargs):
+    search.index_documents([instance])
+
+
+@receiver(post_delete, sender=Document)
+def unindex_document(sender, instance, **kwargs):
+    search.unindex_documents([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Document)
+def invalidate_project_documents(sender, instance, **kwargs):
+    bump_generations([project_scope(instance.project_id, 'documents')])
+
+
+@receiver([post_save, post_delete], sender=Attachment)
+def invalidate_project_attachments(sender, instance, **kwargs):
+    bump_generations([project_scope(instance.project_id, 'attachments')])
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+
+
+def content_hash(content):
+    if getattr(content, 'content_hash', None):
+        return content.content_hash
+
+    hasher = hashlib.sha1()
+    for chunk in content.chunks():
+        hasher.update(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def hash_from_name(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    # Names files by the sha1 of their content, hashing in the same pass that writes them.
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+
+        if getattr(content, 'content_hash', None) and hasattr(content, 'temporary_file_path'):
+            # Already hashed while it was streamed to disk by HashingFileUploadHandler.
+            name = self.get_hashed_name(name, content.content_hash)
+            if not self.exists(name):
+                self._move_into_place(content.temporary_file_path(), name)
+            return name
+
+        return self._stream_into_place(name, content)
+
+    def get_hashed_name(self, name, content_hash):
+        dir_name, file_name = os.path.split(name)
+        file_ext = os.path.splitext(file_name)[1].lower()
+        return os.path.join(dir_name, content_hash + file_ext).replace('\\', '/')
+
+    def _stream_into_place(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        hasher = hashlib.sha1()
+
+        with tempfile.NamedTemporaryFile(dir=self.location, suffix='.upload', delete=False) as temp:
+            try:
+                for chunk in content.chunks():
+                    if not isinstance(chunk, bytes):
+                        chunk = chunk.encode('utf-8')
+                    hasher.update(chunk)
+                    temp.write(chunk)
+            except BaseException:
+                temp.close()
+                os.remove(temp.name)
+                raise
+
+        name = self.get_hashed_name(name, hasher.hexdigest())
+        if self.exists(name):
+            os.remove(temp.name)
+        else:
+            self._move_into_place(temp.name, name)
+        return name
+
+    def _move_into_place(self, temp_path, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+        # Same-filesystem moves are a rename, so the bytes are written only once.
+        file_move_safe(temp_path, full_path, allow_overwrite=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
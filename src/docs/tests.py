@@ -1,8 +1,34 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.core.files.base import ContentFile
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.db.utils import OperationalError
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
 from rest_framework.test import APIClient
 from mixer.backend.django import mixer
+from docs import rendering, revisions, search
 from docs.attachment_creator import AttachmentCreator
-from docs.models import Attachment, Document
+from docs.serializer import DocumentSerializer
+from docs.views import DocumentViewset
+from docs.fields import TextEncoding
+from docs.models import Attachment, Blob, Document, fs
+from docs.storage import HashedFileSystemStorage
+from todocs.pagination import CreatedKeysetPagination
+from todocs.streaming import StreamingASGIHandler
 
 pytestmark = [pytest.mark.django_db]
 
@@ -47,3 +73,589 @@ def test_file_storage(attachment):
     assert attachment.file.path == f'C:\\Users\\AOKov\\PycharmProjects\\todocs\\files\\{attachment.file}'
 
 
+def test_documents_are_cursor_paginated(api, project):
+    documents = mixer.cycle(5).blend(Document, project=project, type='MD')
+
+    seen, url = [], '/api/v1/projects/1/documents/?page_size=2'
+    while url:
+        page = api.get(url).json()
+        assert len(page['results']) <= 2
+        seen += [document['id'] for document in page['results']]
+        url = page['next']
+
+    assert seen == [document.pk for document in documents]
+
+
+def test_cursor_pages_through_equal_created_without_offsets(api, project):
+    documents = mixer.cycle(7).blend(Document, project=project, type='MD')
+    Document.objects.update(created=documents[0].created)
+
+    forward, url = [], '/api/v1/projects/1/documents/?page_size=2'
+    with CaptureQueriesContext(connection) as queries:
+        while url:
+            page = api.get(url).json()
+            forward.append([document['id'] for document in page['results']])
+            url, previous = page['next'], page['previous']
+    assert sum(forward, []) == [document.pk for document in documents]
+    assert not any('OFFSET' in query['sql'] for query in queries.captured_queries)
+
+    backward = []
+    while previous:
+        page = api.get(previous).json()
+        backward.insert(0, [document['id'] for document in page['results']])
+        previous = page['previous']
+    assert backward == forward[:-1]
+
+
+def test_malformed_cursor_is_not_found(api, project):
+    cursor = base64.b64encode(b'p=2021-01-01').decode()
+    assert api.get(f'/api/v1/projects/1/documents/?cursor={cursor}').status_code == 404
+
+
+def test_page_size_is_capped(api, project, monkeypatch):
+    monkeypatch.setattr(CreatedKeysetPagination, 'max_page_size', 2)
+    mixer.cycle(3).blend(Attachment, project=project)
+    request = api.get('/api/v1/projects/1/attachments/?page_size=100000')
+    assert request.status_code == 200
+    assert len(request.json()['results']) == 2
+
+
+def test_storage_hashes_while_writing(tmp_path):
+    storage = HashedFileSystemStorage(location=tmp_path)
+    name = storage.save('report.TXT', ContentFile(b'hello'))
+
+    assert name == f'{hashlib.sha1(b"hello").hexdigest()}.txt'
+    assert storage.open(name).read() == b'hello'
+    assert os.listdir(tmp_path) == [name]
+
+
+def test_streamed_upload_is_moved_into_place(api, project, settings, tmp_path, monkeypatch):
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 0
+    settings.FILE_UPLOAD_TEMP_DIR = str(tmp_path)
+    monkeypatch.setattr(Attachment._meta.get_field('file'), 'storage', HashedFileSystemStorage(location=tmp_path))
+    monkeypatch.setattr(HashedFileSystemStorage, '_stream_into_place', None)
+
+    upload = SimpleUploadedFile('notes.md', b'# streamed')
+    request = api.post('/api/v1/projects/1/attachments/', {'file': upload, 'project': project.pk})
+
+    assert request.status_code == 201
+    assert Attachment.objects.last().file.name == f'{hashlib.sha1(b"# streamed").hexdigest()}.md'
+    assert os.listdir(tmp_path) == [Attachment.objects.last().file.name]
+
+
+def test_identical_uploads_share_one_blob(api, project, tmp_path, monkeypatch, django_capture_on_commit_callbacks):
+    storage = HashedFileSystemStorage(location=tmp_path)
+    monkeypatch.setattr(Attachment._meta.get_field('file'), 'storage', storage)
+    monkeypatch.setattr('docs.models.fs', storage)
+    other_project = mixer.blend('projects.Project')
+
+    for target in (project, other_project):
+        upload = SimpleUploadedFile('template.pdf', b'%PDF-template')
+        assert api.post(f'/api/v1/projects/{target.pk}/attachments/', {'file': upload, 'project': target.pk}).status_code == 201
+
+    blob = Blob.objects.get()
+    assert blob.references == 2 and blob.size == len(b'%PDF-template')
+
+    first, second = Attachment.objects.filter(file=blob.name)
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert storage.exists(blob.name)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not Blob.objects.exists()
+    assert not storage.exists(blob.name)
+
+
+def test_blob_referenced_again_before_collection_is_kept(project, django_capture_on_commit_callbacks):
+    first = AttachmentCreator(ContentFile(b'shared', name='shared.txt'), project.pk)().instance
+    blob = Blob.objects.get()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+        second = AttachmentCreator(ContentFile(b'shared', name='again.txt'), project.pk)().instance
+
+    assert second.file.name == blob.name
+    assert Blob.objects.get().references == 1
+    assert fs.exists(blob.name)
+
+
+def test_upload_of_known_blob_skips_storage(project, monkeypatch):
+    existing = mixer.blend(Attachment, project=project)
+    monkeypatch.setattr(HashedFileSystemStorage, 'save', None)
+
+    AttachmentCreator(ContentFile(existing.file.read(), name='copy.bin'), project.pk)()
+
+    assert Attachment.objects.last().file.name == existing.file.name
+    assert Blob.objects.get().references == 2
+
+
+def test_replacing_an_attachment_file_moves_its_blob_reference(api, project, django_capture_on_commit_callbacks):
+    first = AttachmentCreator(ContentFile(b'shared', name='shared.txt'), project.pk)().instance
+    second = AttachmentCreator(ContentFile(b'shared', name='shared.txt'), project.pk)().instance
+    shared = Blob.objects.get()
+
+    for attachment, content in ((first, b'first'), (second, b'second')):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api.patch(f'/api/v1/projects/1/attachments/{attachment.pk}/',
+                                 {'file': SimpleUploadedFile('new.txt', content)}, format='multipart')
+        assert response.status_code == 200
+        # The old blob stays stored while the other attachment still points at it.
+        assert Blob.objects.filter(pk=shared.pk).exists() == (attachment == first)
+        assert fs.exists(shared.name) == (attachment == first)
+
+    assert sorted(Blob.objects.values_list('hash', 'references')) == \
+        sorted((hashlib.sha1(content).hexdigest(), 1) for content in (b'first', b'second'))
+
+
+@pytest.fixture
+def stored_attachment(project):
+    return AttachmentCreator(ContentFile(b'0123456789', name='digits.txt'), project.pk)().instance
+
+
+def test_download_attachment(api, stored_attachment):
+    response = api.get(f'/api/v1/projects/1/attachments/{stored_attachment.pk}/download/')
+
+    assert response.status_code == 200
+    assert b''.join(response.streaming_content) == b'0123456789'
+    assert response['ETag'] == f'"{hashlib.sha1(b"0123456789").hexdigest()}"'
+    assert response['Content-Disposition'] == 'attachment; filename="digits.txt"'
+
+
+def test_download_attachment_not_modified(api, stored_attachment):
+    etag = f'"{hashlib.sha1(b"0123456789").hexdigest()}"'
+    response = api.get(f'/api/v1/projects/1/attachments/{stored_attachment.pk}/download/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+@pytest.mark.parametrize(('byte_range', 'content', 'content_range'), [
+    ('bytes=2-5', b'2345', 'bytes 2-5/10'),
+    ('bytes=7-', b'789', 'bytes 7-9/10'),
+    ('bytes=-3', b'789', 'bytes 7-9/10'),
+])
+def test_download_attachment_range(api, stored_attachment, byte_range, content, content_range):
+    response = api.get(f'/api/v1/projects/1/attachments/{stored_attachment.pk}/download/', HTTP_RANGE=byte_range)
+
+    assert response.status_code == 206
+    assert b''.join(response.streaming_content) == content
+    assert response['Content-Range'] == content_range
+    assert response['Content-Length'] == str(len(content))
+
+
+def test_download_attachment_unsatisfiable_range(api, stored_attachment):
+    response = api.get(f'/api/v1/projects/1/attachments/{stored_attachment.pk}/download/', HTTP_RANGE='bytes=20-')
+    assert response.status_code == 416
+    assert response['Content-Range'] == 'bytes */10'
+
+
+def test_download_attachment_offloaded_to_proxy(api, stored_attachment, settings):
+    settings.ATTACHMENT_DOWNLOAD_OFFLOAD = 'x-accel-redirect'
+    response = api.get(f'/api/v1/projects/1/attachments/{stored_attachment.pk}/download/')
+
+    assert response.status_code == 200
+    assert response['X-Accel-Redirect'] == f'/protected/files/{stored_attachment.file.name}'
+    assert response['Content-Disposition'] == f'attachment; filename="{stored_attachment.file_name}"'
+    assert response['Content-Type'] == 'text/plain'
+    assert response.content == b''
+
+
+def test_search_documents(api, project):
+    mixer.blend(Document, project=project, type='MD', text='quarterly revenue report for the board')
+    mixer.blend(Document, project=project, type='MD', text='revenue revenue revenue forecast')
+    mixer.blend(Document, project=project, type='MD', text='meeting notes')
+    mixer.blend(Document, type='MD', text='revenue of another project')
+
+    response = api.get('/api/v1/projects/1/documents/search/?q=revenue')
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result['id'] for result in results] == [2, 1]
+    assert '<mark>revenue</mark>' in results[0]['snippet']
+
+
+def test_search_snippet_escapes_document_text(api, project):
+    mixer.blend(Document, project=project, type='MD', text='<img src=x onerror=alert(1)> revenue & costs')
+
+    snippet = api.get('/api/v1/projects/1/documents/search/?q=revenue').json()[0]['snippet']
+
+    assert snippet == '&lt;img src=x onerror=alert(1)&gt; <mark>revenue</mark> &amp; costs'
+
+
+def test_search_index_follows_document_changes(project):
+    document = mixer.blend(Document, project=project, type='MD', text='draft')
+    assert [found.pk for found in search.search_documents(project.pk, 'draft')] == [document.pk]
+
+    document.text = 'final'
+    document.save()
+    assert not list(search.search_documents(project.pk, 'draft'))
+    assert [found.pk for found in search.search_documents(project.pk, 'fin*')] == [document.pk]
+
+    document.delete()
+    assert not list(search.search_documents(project.pk, 'final'))
+
+
+def test_search_without_fts_matches_compressed_text(project, monkeypatch):
+    monkeypatch.setattr(search, 'is_supported', lambda: False)
+    plain = mixer.blend(Document, project=project, type='MD', text='short Needle note')
+    compressed = mixer.blend(Document, project=project, type='MD', text='filler text\n' * 1000 + 'the needle')
+    mixer.blend(Document, project=project, type='MD', text='filler text\n' * 1000)
+    assert Document.objects.get(pk=compressed.pk).text_encoding == TextEncoding.ZLIB
+
+    assert [found.pk for found in search.search_documents(project.pk, 'needle')] == [compressed.pk, plain.pk]
+    assert [found.pk for found in search.search_documents(project.pk, 'needle', limit=1, offset=1)] == [plain.pk]
+
+
+def test_search_without_fts_bounds_decompressed_documents(project, monkeypatch, settings):
+    monkeypatch.setattr(search, 'is_supported', lambda: False)
+    settings.DOCUMENT_SEARCH_DECOMPRESS_LIMIT = 1
+    older, newer = [mixer.blend(Document, project=project, type='MD', text='filler text\n' * 1000 + 'the needle')
+                    for _ in range(2)]
+    headed = mixer.blend(Document, project=project, type='MD', text='needle up front\n' + 'filler text\n' * 1000)
+    Document.objects.filter(pk=headed.pk).update(created=older.created)
+
+    assert [found.pk for found in search.search_documents(project.pk, 'needle')] == [newer.pk, headed.pk]
+
+
+@pytest.mark.parametrize('url', ['/api/v1/projects/abc/documents/', '/api/v1/projects/abc/documents/search/?q=x',
+                                 '/api/v1/projects/abc/attachments/'])
+def test_non_numeric_project_is_not_found(api, url):
+    assert api.get(url).status_code == 404
+
+
+def test_rebuild_search_index(project):
+    mixer.cycle(3).blend(Document, project=project, type='MD', text='indexed text')
+    call_command('rebuild_search_index', stdout=io.StringIO())
+    assert len(list(search.search_documents(project.pk, 'indexed'))) == 3
+
+
+@pytest.mark.parametrize(('old', 'new'), [
+    ('a\nb\nc\n', 'a\nB\nc\nd\n'),
+    ('', 'first line'),
+    ('only\n', ''),
+    ('no newline at end', 'no newline\nat end'),
+])
+def test_revision_delta_roundtrip(old, new):
+    assert revisions.apply_delta(old, revisions.make_delta(old, new)) == new
+
+
+def test_document_revision_history(api, project, monkeypatch):
+    monkeypatch.setattr(revisions, 'SNAPSHOT_INTERVAL', 3)
+    body = '\n'.join(f'unchanged line {number}' for number in range(50))
+    versions = [body] + [f'{body}\nedit {number}' for number in range(6)]
+
+    document_id = api.post('/api/v1/projects/1/documents/', {'type': 'MD', 'text': versions[0], 'project': project.pk}).json()['id']
+    for text in versions[1:]:
+        api.put(f'/api/v1/projects/1/documents/{document_id}/', {'type': 'MD', 'text': text, 'project': project.pk})
+
+    listing = api.get(f'/api/v1/projects/1/documents/{document_id}/revisions/').json()['results']
+    assert [revision['number'] for revision in listing] == list(range(1, 8))
+    assert [revision['is_snapshot'] for revision in listing] == [True, False, False, True, False, False, True]
+
+    for number, text in enumerate(versions, start=1):
+        assert api.get(f'/api/v1/projects/1/documents/{document_id}/revisions/{number}/').json()['text'] == text
+    assert api.get(f'/api/v1/projects/1/documents/{document_id}/revisions/8/').status_code == 404
+
+
+def test_first_edit_keeps_text_saved_before_revisions(api, project):
+    document = mixer.blend(Document, project=project, type='MD', text='written before revisions')
+    document.revisions.all().delete()
+
+    api.patch(f'/api/v1/projects/1/documents/{document.pk}/', {'text': 'first edit'})
+
+    assert api.get(f'/api/v1/projects/1/documents/{document.pk}/revisions/1/').json()['text'] == 'written before revisions'
+    assert api.get(f'/api/v1/projects/1/documents/{document.pk}/revisions/2/').json()['text'] == 'first edit'
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_document_updates_number_revisions_in_order():
+    project = mixer.blend('projects.Project')
+    document = Document.objects.create(project=project, type='MD', text='v0')
+    revisions.record_revision(document)
+    texts = [f'v{number}' for number in range(1, 9)]
+    barrier = threading.Barrier(len(texts))
+
+    def update(text):
+        # Goes through perform_update directly: the test client reraises exceptions from other threads' requests.
+        barrier.wait()
+        try:
+            # Shared-cache SQLite reports table locks at once instead of waiting, so a lost race is retried.
+            for attempt in range(10):
+                try:
+                    serializer = DocumentSerializer(Document.objects.get(pk=document.pk),
+                                                    data={'type': 'MD', 'text': text, 'project': project.pk})
+                    serializer.is_valid(raise_exception=True)
+                    DocumentViewset().perform_update(serializer)
+                    return True
+                except OperationalError:
+                    time.sleep(random.random() * 0.01 * (attempt + 1))
+            return False
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(texts)) as executor:
+        assert all(executor.map(update, texts))
+
+    document.refresh_from_db()
+    assert list(document.revisions.order_by('number').values_list('number', flat=True)) == list(range(1, len(texts) + 2))
+    assert sorted(revisions.get_revision_text(document, number) for number in range(2, len(texts) + 2)) == texts
+    assert revisions.get_revision_text(document, len(texts) + 1) == document.text
+
+
+def test_rendered_markdown_is_opt_in(api, project):
+    document = mixer.blend(Document, project=project, type='MD', text='# Title\n\n<script>alert(1)</script>')
+
+    plain = api.get(f'/api/v1/projects/1/documents/{document.pk}/').json()
+    rendered = api.get(f'/api/v1/projects/1/documents/{document.pk}/?expand=rendered').json()
+
+    assert 'rendered' not in plain
+    assert rendered['rendered'].startswith('<h1>Title</h1>')
+    assert '<script>' not in rendered['rendered']
+
+
+@pytest.mark.parametrize('text', [
+    '[x](javascript:alert(1))', '![x](javascript:alert(1))', '[x](JaVa&#115;cript:alert(1))',
+    '[x]( java\tscript:alert(1))', '[x][ref]\n\n[ref]: vbscript:msgbox(1)', '![x](data:text/html;base64,PHNjcmlwdD4=)',
+])
+def test_rendered_markdown_drops_unsafe_urls(text):
+    rendered = rendering._to_html(text)
+    assert 'href' not in rendered and 'src' not in rendered
+
+
+def test_rendered_markdown_keeps_safe_urls():
+    rendered = rendering._to_html('[a](https://example.com) [b](/docs/1?x=1) [c](mailto:me@example.com) ![d](img.png)')
+    assert rendered == '<p><a href="https://example.com">a</a> <a href="/docs/1?x=1">b</a> ' \
+        '<a href="mailto:me@example.com">c</a> <img alt="d" src="img.png" /></p>'
+
+
+def test_markdown_is_rendered_once_per_content(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rendering, 'render_cache', rendering.LRURenderCache(1024))
+    monkeypatch.setattr(rendering, '_to_html', lambda text: calls.append(text) or f'<p>{text}</p>')
+
+    assert rendering.render_markdown('same') == rendering.render_markdown('same') == '<p>same</p>'
+    assert calls == ['same']
+
+
+def test_render_cache_evicts_least_recently_used():
+    cache = rendering.LRURenderCache(max_bytes=10)
+    cache.set('a', 'aaaa')
+    cache.set('b', 'bbbb')
+    cache.get('a')
+    cache.set('c', 'cccc')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'aaaa' and cache.get('c') == 'cccc'
+    assert cache.size == 8
+
+
+@pytest.fixture
+def large_text():
+    return '\n'.join(f'2021-01-15 19:11:{second % 60:02} INFO worker {second % 7} heartbeat ok' for second in range(500))
+
+
+def test_large_document_text_is_stored_compressed(api, project, large_text):
+    document_id = api.post('/api/v1/projects/1/documents/', {'type': 'DOC', 'text': large_text, 'project': project.pk}).json()['id']
+
+    row = Document.objects.filter(pk=document_id).values('text', 'text_encoding', 'text_compressed', 'text_size').get()
+    assert row['text'] == large_text[:200] and row['text_encoding'] == 'zlib'
+    assert row['text_size'] == len(large_text)
+    assert len(row['text_compressed']) < len(large_text) / 4
+
+    assert Document.objects.get(pk=document_id).text == large_text
+    assert api.get(f'/api/v1/projects/1/documents/{document_id}/').json()['text'] == large_text
+
+
+def test_small_document_text_stays_plain(project):
+    document = Document.objects.create(project=project, type='MD', text='short')
+    assert Document.objects.filter(pk=document.pk).values_list('text', 'text_encoding').get() == ('short', 'plain')
+
+
+def test_compressed_text_is_decompressed_only_on_access(project, large_text, django_assert_num_queries):
+    Document.objects.create(project=project, type='DOC', text=large_text)
+    document = Document.objects.defer('text').get()
+
+    with django_assert_num_queries(1):
+        assert document.text == large_text
+
+
+def test_compress_documents_command(project, large_text):
+    documents = mixer.cycle(3).blend(Document, project=project, type='DOC', text='small')
+    Document.objects.filter(pk__in=[document.pk for document in documents[:2]]).update(text=large_text)
+
+    output = io.StringIO()
+    call_command('compress_documents', batch_size=1, stdout=output)
+
+    assert 'Compressed 2 documents' in output.getvalue()
+    assert list(Document.objects.order_by('pk').values_list('text_encoding', flat=True)) == ['zlib', 'zlib', 'plain']
+    assert [document.text for document in Document.objects.order_by('pk')] == [large_text, large_text, 'small']
+
+
+def test_compress_documents_command_loads_each_batch_once(project, large_text, django_assert_max_num_queries):
+    documents = mixer.cycle(20).blend(Document, project=project, type='DOC', text='small')
+    Document.objects.filter(pk__in=[document.pk for document in documents]).update(text=large_text)
+
+    # Two batch reads, a savepoint pair and one update per document.
+    with django_assert_max_num_queries(24):
+        call_command('compress_documents', stdout=io.StringIO())
+
+
+def test_document_retrieve_answers_304_until_changed(api, project):
+    document = mixer.blend(Document, project=project, type='DOC', text='first')
+    url = f'/api/v1/projects/{project.pk}/documents/{document.pk}/'
+    etag = api.get(url)['ETag']
+
+    assert api.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+    assert api.get(f'/api/v1/projects/{project.pk}/attachments/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    api.patch(url, {'text': 'second'})
+    changed = api.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed.json()['text'] == 'second'
+
+
+def test_cached_document_list_is_invalidated_by_document_changes(api, project, django_assert_num_queries):
+    document = mixer.blend(Document, project=project, type='DOC', text='first')
+    url = f'/api/v1/projects/{project.pk}/documents/'
+    first = api.get(url)
+
+    with django_assert_num_queries(0):
+        assert api.get(url).content == first.content
+
+    api.patch(f'{url}{document.pk}/', {'text': 'second'})
+    assert api.get(url).json()['results'][0]['preview'] == 'second'
+
+    mixer.blend(Attachment, project=project)
+    with django_assert_num_queries(0):
+        api.get(url)
+
+
+def test_document_list_is_summary_without_text(api, project, large_text, django_assert_num_queries):
+    mixer.blend(Document, project=project, type='DOC', text='short body')
+    Document.objects.create(project=project, type='MD', text=large_text)
+
+    with django_assert_num_queries(1) as captured:
+        results = api.get(f'/api/v1/projects/{project.pk}/documents/').json()['results']
+
+    assert 'text_compressed' not in captured.captured_queries[0]['sql']
+    assert [set(result) for result in results] == [{'id', 'type', 'project', 'created', 'size', 'preview'}] * 2
+    assert [(result['size'], result['preview']) for result in results] == \
+        [(10, 'short body'), (len(large_text), large_text[:200])]
+
+
+def test_document_list_expand_text_returns_full_documents(api, project, large_text):
+    Document.objects.create(project=project, type='DOC', text=large_text)
+
+    results = api.get(f'/api/v1/projects/{project.pk}/documents/?expand=text').json()['results']
+    assert results[0]['text'] == large_text
+
+
+def test_compressed_document_text_reassignment(project, large_text):
+    document = Document.objects.create(project=project, type='DOC', text=large_text)
+    document = Document.objects.get(pk=document.pk)
+    document.text = 'replaced'
+    assert document.text == 'replaced'
+
+    document.save()
+    assert Document.objects.get(pk=document.pk).text == 'replaced'
+
+
+def test_async_upload_attachment(api, project):
+    response = api.post(f'/api/v1/async/projects/{project.pk}/attachments/',
+                        {'file': SimpleUploadedFile('notes.txt', b'async body')}, format='multipart')
+
+    assert response.status_code == 201
+    assert Attachment.objects.get(pk=response.json()['id']).file.read() == b'async body'
+
+
+def test_async_download_attachment_range(api, stored_attachment):
+    response = api.get(f'/api/v1/async/projects/{stored_attachment.project_id}/attachments/{stored_attachment.pk}/download/',
+                       HTTP_RANGE='bytes=2-5')
+
+    assert response.status_code == 206
+    assert b''.join(response.streaming_content) == b'2345'
+
+
+@pytest.fixture
+def asgi_application():
+    # Like django.test.AsyncClient, keep the request signals away from the test transaction.
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    yield StreamingASGIHandler()
+    request_started.connect(close_old_connections)
+    request_finished.connect(close_old_connections)
+
+
+def test_async_downloads_hold_many_slow_clients(asgi_application, project):
+    content = os.urandom(64 * 1024)
+    attachment = AttachmentCreator(ContentFile(content, name='slow.bin'), project.pk)()
+    path = f'/api/v1/async/projects/{project.pk}/attachments/{attachment.instance.pk}/download/'
+    in_flight, peak = set(), []
+
+    async def slow_client(number):
+        received = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                received.append(message.get('body', b''))
+                in_flight.add(number)
+                peak.append(len(in_flight))
+                await asyncio.sleep(0.005)
+                if not message.get('more_body'):
+                    in_flight.discard(number)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': [],
+                 'server': ('testserver', 80), 'client': ('127.0.0.1', 0)}
+        await asgi_application(scope, receive, send)
+        return b''.join(received)
+
+    async def load():
+        return await asyncio.gather(*(slow_client(number) for number in range(200)))
+
+    assert async_to_sync(load)() == [content] * 200
+    assert max(peak) > 100
+
+
+def test_profiled_async_download_counts_queries_of_sync_threads(asgi_application, stored_attachment, settings):
+    settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+    path = f'/api/v1/async/projects/{stored_attachment.project_id}/attachments/{stored_attachment.pk}/download/'
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': [],
+             'server': ('testserver', 80), 'client': ('127.0.0.1', 0)}
+    async_to_sync(asgi_application)(scope, receive, send)
+
+    headers = dict(messages[0]['headers'])
+    assert messages[0]['status'] == 200
+    assert b'desc="1 queries"' in headers[b'Server-Timing']
+
+
+def test_document_lists_fast_path_matches_serializer(api, project, large_text, reference_content,
+                                                     django_assert_num_queries):
+    Document.objects.create(project=project, type='MD', text=large_text)
+    Document.objects.create(project=project, type='DOC', text='Ünïcode\u2028line\nbreak "quoted"')
+    mixer.cycle(3).blend(Document, project=project, type='DOC')
+
+    for url in [f'/api/v1/projects/{project.pk}/documents/?page_size=2',
+                f'/api/v1/projects/{project.pk}/documents/?page_size=2&expand=text']:
+        with django_assert_num_queries(1):
+            content = api.get(url).content
+        assert content == reference_content(api, url)
+
+
+def test_attachment_list_fast_path_matches_serializer(api, project, reference_content):
+    for name in ['first.txt', 'second.txt']:
+        AttachmentCreator(SimpleUploadedFile(name, name.encode()), project.pk)()
+
+    url = f'/api/v1/projects/{project.pk}/attachments/'
+    content = api.get(url).content
+    assert json.loads(content)['results'][0]['file'].startswith('http://testserver/')
+    assert content == reference_content(api, url)
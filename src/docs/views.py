@@ -1,26 +1,115 @@
 from rest_framework import viewsets, status
-from docs.models import Document, Attachment
-from docs.serializer import DocumentSerializer, AttachmentSerializer
+from docs.models import Document, Attachment, DocumentRevision
+from docs.serializer import DocumentSerializer, AttachmentSerializer, DocumentSearchResultSerializer, \
+    DocumentSearchQuerySerializer, DocumentRevisionSerializer, DocumentSummarySerializer
+from docs.search import search_documents
+from docs.revisions import record_base_revision, record_revision, get_revision_text
+from django.db import transaction
+from django.http import Http404
 from docs.attachment_creator import AttachmentCreator
+from docs.attachment_downloader import AttachmentDownloader
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from todocs.pagination import CreatedKeysetPagination
+from todocs.conditional import ConditionalGetMixin
+from todocs.profiling import ProfiledViewMixin
+from todocs.projections import ValuesListMixin
+from todocs.routers import ReplicaReadMixin
+from todocs.generations import project_scope
 
 
-class DocumentViewset(viewsets.ModelViewSet):
+class DocumentViewset(ProfiledViewMixin, ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin,
+                      viewsets.ModelViewSet):
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
+    pagination_class = CreatedKeysetPagination
 
     def get_queryset(self):
-        return Document.objects.filter(project=self.kwargs['project_pk'])
+        documents = Document.objects.filter(project=self.kwargs['project_pk'])
+        if self.is_summary():
+            return documents.summaries()
+        return documents
 
+    def get_generation_scopes(self):
+        return [project_scope(self.kwargs['project_pk'], 'documents')]
 
-class AttachmentViewset(viewsets.ModelViewSet):
+    def get_expand(self):
+        return self.request.query_params.get('expand', '').split(',')
+
+    def is_summary(self):
+        # Lists only carry size and preview unless the full text is asked for with ?expand=text.
+        return self.action == 'list' and 'text' not in self.get_expand()
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return DocumentSummarySerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request is not None and not self.is_summary():
+            kwargs.setdefault('expand', self.get_expand())
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            record_revision(serializer.save())
+
+    def perform_update(self, serializer):
+        # The row stays locked from before the save until its revision is written.
+        with transaction.atomic():
+            record_base_revision(serializer.instance)
+            record_revision(serializer.save())
+
+    @action(detail=True)
+    def revisions(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_object().revisions.all())
+        serializer = DocumentRevisionSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, url_path=r'revisions/(?P<number>\d+)')
+    def revision(self, request, number, *args, **kwargs):
+        document = self.get_object()
+        try:
+            text = get_revision_text(document, int(number))
+        except DocumentRevision.DoesNotExist:
+            raise Http404
+
+        revision = document.revisions.get(number=number)
+        return Response({**DocumentRevisionSerializer(revision).data, 'text': text})
+
+    @action(detail=False)
+    def search(self, request, *args, **kwargs):
+        query = DocumentSearchQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        documents = search_documents(self.kwargs['project_pk'], query.validated_data['q'],
+                                     query.validated_data['limit'], query.validated_data['offset'])
+        serializer = DocumentSearchResultSerializer(documents, many=True)
+        return Response(serializer.data)
+
+
+class AttachmentViewset(ProfiledViewMixin, ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin,
+                        viewsets.ModelViewSet):
     queryset = Attachment.objects.all()
     serializer_class = AttachmentSerializer
+    pagination_class = CreatedKeysetPagination
 
     def get_queryset(self):
         return Attachment.objects.filter(project=self.kwargs['project_pk'])
 
+    def get_generation_scopes(self):
+        return [project_scope(self.kwargs['project_pk'], 'attachments')]
+
     def create(self, request, *args, **kwargs):
         serializer = AttachmentCreator(request.data['file'], request.data['project'])()
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_update(self, serializer):
+        # A replaced file moves its blob reference in the same transaction as the row.
+        with transaction.atomic():
+            serializer.save()
+
+    @action(detail=True)
+    def download(self, request, *args, **kwargs):
+        return AttachmentDownloader(self.get_object(), request)()
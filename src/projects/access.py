@@ -0,0 +1,42 @@
+from typing import Dict, Iterable
+
+from django.apps import apps
+from django.core.cache import cache
+from todocs.generations import PROJECTS_SCOPE, bump_generations, get_generation, project_scope
+
+
+# Generation bumps invalidate maps at once; the timeout only bounds how long a map outlives a lost invalidation.
+ACCESS_MAP_TIMEOUT = 5 * 60
+
+
+def access_map_scope(user_id):
+    return f'access-map:{user_id}'
+
+
+def get_access_map(user: 'users.User') -> Dict[int, str]:
+    if not user.is_authenticated:
+        return {}
+
+    key = f'projects:access-map:{user.pk}:{get_generation(access_map_scope(user.pk))}'
+    access_map = cache.get(key)
+    if access_map is None:
+        # Always from the primary: a lagging replica would be cached under the new generation.
+        collaborations = apps.get_model('projects', 'Collaboration').objects.using('default').filter(user=user)
+        access_map = dict(collaborations.values_list('project_id', 'access_level'))
+        cache.set(key, access_map, ACCESS_MAP_TIMEOUT)
+
+    return access_map
+
+
+def get_request_access_map(request) -> Dict[int, str]:
+    cached = getattr(request, '_access_map', None)
+    if cached is None or cached[0] != request.user.pk:
+        cached = (request.user.pk, get_access_map(request.user))
+        request._access_map = cached
+
+    return cached[1]
+
+
+def invalidate_collaborations(project_id: int, user_ids: Iterable[int]):
+    scopes = [access_map_scope(user_id) for user_id in user_ids]
+    bump_generations(scopes + [project_scope(project_id, 'collaborations'), PROJECTS_SCOPE])
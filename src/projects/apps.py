@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProjectConfig(AppConfig):
     name = 'projects'
+
+    def ready(self):
+        import projects.checks  # noqa: F401
+        import projects.signals  # noqa: F401
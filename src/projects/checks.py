@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core import checks
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # Access maps and generation counters are invalidated through the default cache. A per-process
+    # cache only sees the invalidations of its own worker, the others keep serving revoked access.
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [checks.Error(
+        'The default cache is local to each process, so access changes do not reach other workers.',
+        hint='Set CACHE_URL to a shared cache, e.g. redis://127.0.0.1:6379/1.',
+        id='projects.E001',
+    )]
@@ -0,0 +1,97 @@
+from django.db import IntegrityError, transaction
+from projects.access import invalidate_collaborations
+from projects.models import Collaboration, Perms, Project
+from users.models import User
+
+
+class CollaborationBulkEditor:
+    def __init__(self, project, collaborators=(), remove=()):
+        self.project = project
+        self.collaborators = collaborators
+        self.remove = remove
+
+    def __call__(self):
+        with transaction.atomic():
+            results, to_create, to_update, to_remove = self.plan()
+            if any(result['status'] == 'error' for result in results):
+                return False, results
+
+            try:
+                with transaction.atomic():
+                    Collaboration.objects.bulk_create(to_create)
+            except IntegrityError:
+                # Added since plan() by a request that does not take the project lock, e.g. a single create.
+                return False, self.conflicts(results, to_create)
+            Collaboration.objects.bulk_update(to_update, ['access_level'])
+            Collaboration.objects.filter(pk__in=[collaboration.pk for collaboration in to_remove]).delete()
+
+            invalidate_collaborations(self.project.pk, [collaboration.user_id for collaboration in to_create + to_update])
+
+        return True, results
+
+    def plan(self):
+        # Serializes bulk edits of one project, so none of them inserts a collaborator the other planned to create.
+        Project.objects.select_for_update().filter(pk=self.project.pk).values_list('pk', flat=True).first()
+
+        user_ids = {entry['user'] for entry in self.collaborators} | set(self.remove)
+        known_users = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        current = {
+            collaboration.user_id: collaboration
+            for collaboration in Collaboration.objects.select_for_update().filter(project=self.project,
+                                                                                  user__in=user_ids)
+        }
+
+        results, to_create, to_update, to_remove = [], [], [], []
+        seen = set()
+
+        for entry in self.collaborators:
+            user_id, access_level = entry['user'], entry['access_level']
+            collaboration = current.get(user_id)
+
+            if user_id in seen:
+                results.append(self.error(user_id, 'Duplicate entry for this user.'))
+            elif user_id not in known_users:
+                results.append(self.error(user_id, 'User does not exist.'))
+            elif collaboration is None:
+                to_create.append(Collaboration(user_id=user_id, project=self.project, access_level=access_level))
+                results.append(self.result(user_id, 'created'))
+            elif collaboration.access_level == Perms.OWNER:
+                results.append(self.error(user_id, 'Owner access level can not be changed.'))
+            elif collaboration.access_level == access_level:
+                results.append(self.result(user_id, 'unchanged'))
+            else:
+                collaboration.access_level = access_level
+                to_update.append(collaboration)
+                results.append(self.result(user_id, 'updated'))
+            seen.add(user_id)
+
+        for user_id in self.remove:
+            collaboration = current.get(user_id)
+
+            if user_id in seen:
+                results.append(self.error(user_id, 'Duplicate entry for this user.'))
+            elif collaboration is None:
+                results.append(self.error(user_id, 'User is not a collaborator of this project.'))
+            elif collaboration.access_level == Perms.OWNER:
+                results.append(self.error(user_id, 'Owner can not be removed.'))
+            else:
+                to_remove.append(collaboration)
+                results.append(self.result(user_id, 'removed'))
+            seen.add(user_id)
+
+        return results, to_create, to_update, to_remove
+
+    def conflicts(self, results, to_create):
+        existing = set(Collaboration.objects.filter(project=self.project,
+                                                    user__in=[collaboration.user_id for collaboration in to_create])
+                       .values_list('user_id', flat=True))
+        return [self.error(result['user'], 'User is already a collaborator of this project.')
+                if result['status'] == 'created' and result['user'] in existing else result for result in results]
+
+    @staticmethod
+    def result(user_id, status):
+        return {'user': user_id, 'status': status}
+
+    @staticmethod
+    def error(user_id, detail):
+        return {'user': user_id, 'status': 'error', 'detail': detail}
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Reports projects whose Project.owner differs from their owner Collaboration, optionally repairing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Copy the owner from the owner Collaboration')
+
+    def handle(self, *args, **options):
+        mismatches = list(Project.objects.inconsistent_owners().order_by('pk')
+                          .values_list('pk', 'owner_id', 'owner_collaborator'))
+        for pk, owner_id, collaborator_id in mismatches:
+            self.stdout.write(f'Project {pk}: owner {owner_id}, owner collaboration user {collaborator_id}')
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('All project owners are consistent.'))
+            return
+
+        if not options['fix']:
+            raise CommandError(f'{len(mismatches)} projects have an inconsistent owner, rerun with --fix to repair.')
+
+        # The owner is re-read from Collaboration inside the UPDATE, not taken from the report above.
+        fixed = Project.objects.filter(pk__in=[pk for pk, _, _ in mismatches]).sync_owners()
+        self.stdout.write(self.style.SUCCESS(f'Fixed the owner of {fixed} projects.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from projects.models import Project
+from projects.project_exporter import ProjectExporter
+
+
+class Command(BaseCommand):
+    help = 'Streams a project with its documents, attachments and collaborators into a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('output', nargs='?', help='Archive path, defaults to project-<id>.zip')
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options['project_id'])
+        except Project.DoesNotExist:
+            raise CommandError(f'Project {options["project_id"]} does not exist.')
+
+        exporter = ProjectExporter(project)
+        output = options['output'] or exporter.filename
+
+        written = 0
+        with open(output, 'wb') as archive:
+            for chunk in exporter():
+                archive.write(chunk)
+                written += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f'Exported project {project.pk} to {output} ({written} bytes).'))
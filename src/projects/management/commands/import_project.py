@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from projects.project_importer import ProjectImporter, ArchiveError
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Creates a project from an archive produced by export_project, owned by the given user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive')
+        parser.add_argument('owner', help='Email of the user who will own the imported project')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f'User {options["owner"]} does not exist.')
+
+        started = time.perf_counter()
+        importer = ProjectImporter(options['archive'], owner, batch_size=options['batch_size'], progress=self.report)
+        try:
+            serializer = importer()
+        except (ArchiveError, OSError) as e:
+            raise CommandError(str(e))
+
+        counts = importer.counts
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported project {serializer.instance.pk}: {counts["documents"]} documents, '
+            f'{counts["attachments"]} attachments ({counts["blobs_written"]} new blobs) '
+            f'in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def report(self, stage, done):
+        self.stdout.write(f'Imported {done} {stage}')
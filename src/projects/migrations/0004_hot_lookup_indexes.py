@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_auto_20210115_1911'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='collaboration',
+            constraint=models.UniqueConstraint(condition=models.Q(('access_level', 'owner')), fields=('project',), name='one owner per project'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_owners(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Collaboration = apps.get_model('projects', 'Collaboration')
+
+    owner = Collaboration.objects.filter(project=OuterRef('pk'), access_level='owner').values('user_id')[:1]
+    Project.objects.update(owner=Subquery(owner))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('projects', '0004_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='owner',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='owned_projects', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_owners, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models, transaction
+from django.db.models import F, OuterRef, Q, Subquery
+from projects.access import invalidate_collaborations
 
 
 class Perms(models.TextChoices):
@@ -11,48 +13,81 @@ class OwnerMutationError(Exception):
     pass
 
 
+class ProjectQuerySet(models.QuerySet):
+    def with_owner_collaborator(self):
+        owner = Collaboration.objects.filter(project=OuterRef('pk'), access_level=Perms.OWNER).values('user_id')[:1]
+        return self.annotate(owner_collaborator=Subquery(owner))
+
+    def inconsistent_owners(self):
+        return self.with_owner_collaborator().filter(
+            Q(owner__isnull=False, owner_collaborator__isnull=False) & ~Q(owner=F('owner_collaborator')) |
+            Q(owner__isnull=True, owner_collaborator__isnull=False) |
+            Q(owner__isnull=False, owner_collaborator__isnull=True)
+        )
+
+    def sync_owners(self):
+        owner = Collaboration.objects.filter(project=OuterRef('pk'), access_level=Perms.OWNER).values('user_id')[:1]
+        return self.update(owner=Subquery(owner))
+
+
 class Project(models.Model):
     name = models.CharField(max_length=128)
     users = models.ManyToManyField('users.User', through='Collaboration')
+    # Mirrors the owner Collaboration; ProjectCreator and change_owner write both in one transaction.
+    owner = models.ForeignKey('users.User', null=True, on_delete=models.SET_NULL, related_name='owned_projects')
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = ProjectQuerySet.as_manager()
+
     def change_owner(self, new_owner_collaboration: 'projects.Collaboration', demote_to: Perms):
-        current_owner_collaboration = Collaboration.objects.get(project=self,
-                                                                access_level=Perms.OWNER)
         with transaction.atomic():
-            current_owner_collaboration.access_level = demote_to
-            current_owner_collaboration.save()
-
-            new_owner_collaboration.access_level = Perms.OWNER
-            new_owner_collaboration.save()
+            # Concurrent transfers queue on the project row and each sees the owner its predecessor wrote.
+            owner_id = Project.objects.select_for_update().filter(pk=self.pk)\
+                .values_list('owner_id', flat=True).first()
+            if owner_id is None:
+                raise OwnerMutationError
+
+            # Demote before promoting: "one owner per project" is checked row by row.
+            demoted = Collaboration.objects.filter(project=self, user_id=owner_id, access_level=Perms.OWNER)\
+                .update(access_level=demote_to)
+            promoted = Collaboration.objects.filter(project=self, pk=new_owner_collaboration.pk)\
+                .exclude(user_id=owner_id).update(access_level=Perms.OWNER)
+            if demoted != 1 or promoted != 1:
+                raise OwnerMutationError
+
+            Project.objects.filter(pk=self.pk).update(owner_id=new_owner_collaboration.user_id)
+            invalidate_collaborations(self.pk, [owner_id, new_owner_collaboration.user_id])
+
+        self.owner_id = new_owner_collaboration.user_id
+        new_owner_collaboration.access_level = Perms.OWNER
 
     def edit_collaborator(self, user: 'users.User', new_access_level: Perms):
-        owner = Collaboration.objects.get(project=self, access_level=Perms.OWNER)
-        user_to_update = Collaboration.objects.get(user=user, project=self)
-
-        if owner == user_to_update:
+        if user.pk == self.owner_id:
             raise OwnerMutationError
 
-        user_to_update.access_level = new_access_level
-        user_to_update.save()
+        updated = self._non_owner_collaborations(user).update(access_level=new_access_level)
+        if not updated:
+            raise Collaboration.DoesNotExist('Collaboration matching query does not exist.')
 
-    def add_collaborator(self, user: 'users.User', access_level: Perms):
-        owner = Collaboration.objects.get(project=self, access_level=Perms.OWNER)
-        user_to_create = Collaboration(user=user, project=self, access_level=access_level)
+        invalidate_collaborations(self.pk, [user.pk])
 
-        if owner.access_level == user_to_create.access_level:
+    def add_collaborator(self, user: 'users.User', access_level: Perms):
+        if access_level == Perms.OWNER:
             raise OwnerMutationError
 
-        user_to_create.save()
+        Collaboration.objects.create(user=user, project=self, access_level=access_level)
 
     def remove_collaborator(self, user: 'users.User'):
-        owner = Collaboration.objects.get(project=self, access_level=Perms.OWNER)
-        user_to_delete = Collaboration.objects.get(user=user, project=self)
-
-        if owner == user_to_delete:
+        if user.pk == self.owner_id:
             raise OwnerMutationError
 
-        user_to_delete.delete()
+        deleted, _ = self._non_owner_collaborations(user).delete()
+        if not deleted:
+            raise Collaboration.DoesNotExist('Collaboration matching query does not exist.')
+
+    def _non_owner_collaborations(self, user: 'users.User'):
+        # The access level filter still guards a project instance whose owner_id went stale.
+        return Collaboration.objects.filter(user=user, project=self).exclude(access_level=Perms.OWNER)
 
 
 class Collaboration(models.Model):
@@ -62,5 +97,7 @@ class Collaboration(models.Model):
 
     class Meta:
         constraints = [
-            models.UniqueConstraint(fields=['user', 'project'], name='unique collaboration')
+            models.UniqueConstraint(fields=['user', 'project'], name='unique collaboration'),
+            models.UniqueConstraint(fields=['project'], condition=Q(access_level=Perms.OWNER),
+                                    name='one owner per project'),
         ]
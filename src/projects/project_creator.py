@@ -1,3 +1,4 @@
+from django.db import transaction
 from projects.serializer import ProjectSerializer
 from projects.models import Collaboration
 
@@ -12,9 +13,10 @@ class ProjectCreator:
     def __call__(self):
         serializer = ProjectSerializer(data=self.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
 
-        self.create_collaborator(serializer.instance)
+        with transaction.atomic():
+            serializer.save(owner=self.owner)
+            self.create_collaborator(serializer.instance)
 
         return serializer
 
@@ -0,0 +1,118 @@
+import json
+import zipfile
+
+from django.core.serializers.json import DjangoJSONEncoder
+from docs.models import Attachment, Document, FileType, fs
+from docs.storage import hash_from_name
+from projects.models import Collaboration
+
+EXTENSIONS = {FileType.MARKDOWN: 'md', FileType.DOCS: 'txt'}
+
+
+class ZipStream:
+    # Write-only, unseekable sink: zipfile falls back to data descriptors and we drain
+    # whatever it has written after every chunk, so nothing accumulates.
+    def __init__(self):
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+class ProjectExporter:
+    def __init__(self, project, chunk_size=64 * 1024):
+        self.project = project
+        self.chunk_size = chunk_size
+
+    @property
+    def filename(self):
+        return f'project-{self.project.pk}.zip'
+
+    def __call__(self):
+        stream = ZipStream()
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            yield from self.write_entry(archive, stream, 'project.json', [self.dump(self.get_manifest())])
+            yield from self.write_entry(archive, stream, 'documents.jsonl', self.dump_lines(self.get_document_index()))
+            yield from self.write_entry(archive, stream, 'attachments.jsonl', self.dump_lines(self.get_attachment_index()))
+
+            documents = Document.objects.filter(project=self.project).order_by('pk')
+            for document in documents.iterator(chunk_size=100):
+                text = document.text.encode('utf-8')
+                yield from self.write_entry(archive, stream, self.document_path(document.pk, document.type),
+                                            [text], date=document.created, size=len(text))
+
+            attachments = Attachment.objects.filter(project=self.project).order_by('pk')
+            for attachment in attachments.iterator(chunk_size=100):
+                with fs.open(attachment.file.name, 'rb') as file:
+                    yield from self.write_entry(archive, stream, self.attachment_path(attachment.pk, attachment.file_name),
+                                                iter(lambda: file.read(self.chunk_size), b''),
+                                                date=attachment.created, size=fs.size(attachment.file.name),
+                                                compression=zipfile.ZIP_STORED)
+        yield stream.drain()
+
+    def write_entry(self, archive, stream, path, chunks, date=None, size=0, compression=zipfile.ZIP_DEFLATED):
+        info = zipfile.ZipInfo(path, date_time=(date or self.project.created).timetuple()[:6])
+        info.compress_type = compression
+        info.file_size = size
+
+        with archive.open(info, 'w') as entry:
+            for chunk in chunks:
+                entry.write(chunk)
+                data = stream.drain()
+                if data:
+                    yield data
+        yield stream.drain()
+
+    def get_manifest(self):
+        collaborators = Collaboration.objects.filter(project=self.project).order_by('pk')\
+            .values('user_id', 'user__email', 'access_level')
+        return {
+            'id': self.project.pk,
+            'name': self.project.name,
+            'created': self.project.created,
+            'collaborators': [{'user': row['user_id'], 'email': row['user__email'], 'access_level': row['access_level']}
+                              for row in collaborators],
+        }
+
+    def get_document_index(self):
+        documents = Document.objects.filter(project=self.project).order_by('pk').values('pk', 'type', 'created')
+        for row in documents.iterator(chunk_size=1000):
+            yield {'id': row['pk'], 'type': row['type'], 'created': row['created'],
+                   'path': self.document_path(row['pk'], row['type'])}
+
+    def get_attachment_index(self):
+        attachments = Attachment.objects.filter(project=self.project).order_by('pk')\
+            .values('pk', 'file', 'file_name', 'created')
+        for row in attachments.iterator(chunk_size=1000):
+            yield {'id': row['pk'], 'file_name': row['file_name'], 'created': row['created'],
+                   'hash': hash_from_name(row['file']), 'path': self.attachment_path(row['pk'], row['file_name'])}
+
+    @staticmethod
+    def document_path(pk, file_type):
+        return f'documents/{pk}.{EXTENSIONS.get(file_type, "txt")}'
+
+    @staticmethod
+    def attachment_path(pk, file_name):
+        return f'attachments/{pk}/{file_name.replace("/", "_")}'
+
+    @staticmethod
+    def dump(value):
+        return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8')
+
+    def dump_lines(self, rows):
+        for row in rows:
+            yield self.dump(row) + b'\n'
@@ -0,0 +1,142 @@
+import json
+import os
+import zipfile
+
+from django.db import transaction
+from docs import search
+from docs.models import Attachment, Blob, Document, FileType, fs
+from docs.storage import hash_from_name
+from docs.uploads import HashingFileUploadHandler
+from projects.project_creator import ProjectCreator
+from todocs.generations import bump_generations, project_scope
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class ProjectImporter:
+    # Reads archives produced by ProjectExporter; collaborators are not restored, the importing user owns the project.
+    def __init__(self, archive, owner, batch_size=1000, progress=None):
+        self.archive = archive
+        self.owner = owner
+        self.batch_size = batch_size
+        self.progress = progress or (lambda stage, done: None)
+        self.counts = {'documents': 0, 'attachments': 0, 'blobs_written': 0}
+        self.written = []
+
+    def __call__(self):
+        try:
+            return self.import_archive()
+        except BaseException:
+            self.discard_written_blobs()
+            raise
+
+    def import_archive(self):
+        try:
+            with zipfile.ZipFile(self.archive) as archive, transaction.atomic():
+                manifest = json.loads(archive.read('project.json'))
+                serializer = ProjectCreator(manifest['name'], self.owner)()
+                project = serializer.instance
+
+                self.import_documents(archive, project)
+                self.import_attachments(archive, project)
+                bump_generations([project_scope(project.pk, 'documents'), project_scope(project.pk, 'attachments')])
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise ArchiveError(f'Not a valid project archive: {e}')
+
+        return serializer
+
+    def import_documents(self, archive, project):
+        batch = []
+        for row in self.read_index(archive, 'documents.jsonl'):
+            if row['type'] not in FileType.values:
+                raise ValueError(f'unknown document type {row["type"]!r}')
+
+            document = Document(project=project, type=row['type'], text=archive.read(row['path']).decode('utf-8'))
+            document.prepare_text()
+            batch.append(document)
+            if len(batch) == self.batch_size:
+                self.create_documents(batch)
+                batch = []
+        self.create_documents(batch)
+
+        # bulk_create skips post_save, so the search index is filled in one pass afterwards.
+        search.index_queryset(Document.objects.filter(project=project), self.batch_size)
+
+    def create_documents(self, batch):
+        Document.objects.bulk_create(batch)
+        self.counts['documents'] += len(batch)
+        self.progress('documents', self.counts['documents'])
+
+    def import_attachments(self, archive, project):
+        batch = []
+        for row in self.read_index(archive, 'attachments.jsonl'):
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                self.create_attachments(archive, project, batch)
+                batch = []
+        self.create_attachments(archive, project, batch)
+
+    def create_attachments(self, archive, project, rows):
+        # Content is only ever matched by the hash of the archive's own bytes; the index's hash column is not trusted.
+        uploads = [self.store_member(archive, row) for row in rows]
+        stored = dict(Blob.objects.select_for_update().filter(hash__in={hash_from_name(name) for name, _ in uploads})
+                      .values_list('hash', 'name'))
+
+        attachments, references = [], {}
+        for row, (name, size) in zip(rows, uploads):
+            blob_name = stored.setdefault(hash_from_name(name), name)
+            if blob_name != name and name in self.written:
+                # Same content already stored under another extension.
+                fs.delete(name)
+                self.written.remove(name)
+                self.counts['blobs_written'] -= 1
+
+            attachments.append(Attachment(project=project, file=blob_name, file_name=row['file_name']))
+            size, count = references.get(blob_name, (size, 0))
+            references[blob_name] = (size, count + 1)
+
+        Attachment.objects.bulk_create(attachments, batch_size=self.batch_size)
+        Blob.objects.reference_many(references)
+        self.counts['attachments'] += len(attachments)
+        self.progress('attachments', self.counts['attachments'])
+
+    def store_member(self, archive, row):
+        # Spooled through the same handler as HTTP uploads, so the bytes are hashed as they are read.
+        handler, size = HashingFileUploadHandler(), 0
+        with archive.open(row['path']) as member:
+            handler.new_file('file', os.path.basename(row['file_name']), 'application/octet-stream', None)
+            try:
+                for chunk in iter(lambda: member.read(handler.chunk_size), b''):
+                    handler.receive_data_chunk(chunk, size)
+                    size += len(chunk)
+            except BaseException:
+                handler.upload_interrupted()
+                raise
+        upload = handler.file_complete(size)
+
+        try:
+            name = fs.get_hashed_name(upload.name, upload.content_hash)
+            if not fs.exists(name):
+                fs.save(name, upload)
+                self.written.append(name)
+                self.counts['blobs_written'] += 1
+        finally:
+            upload.close()
+        return name, size
+
+    def discard_written_blobs(self):
+        # Files written by an import that rolled back; anything a committed blob points at is kept.
+        kept = set(Blob.objects.filter(name__in=self.written).values_list('name', flat=True))
+        for name in self.written:
+            if name not in kept:
+                fs.delete(name)
+        self.written = []
+
+    @staticmethod
+    def read_index(archive, path):
+        with archive.open(path) as index:
+            for line in index:
+                if line.strip():
+                    yield json.loads(line)
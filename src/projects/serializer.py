@@ -1,9 +1,18 @@
-from projects.models import Project, Collaboration, Perms
+from projects.models import Project, Collaboration
 from rest_framework import serializers
-from users.serializer import UserSerializer
+from users.serializer import UserSerializer, UserSummarySerializer
 
 
-class ProjectSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     users = UserSerializer(read_only=True, many=True)
 
     class Meta:
@@ -11,6 +20,10 @@ class ProjectSerializer(serializers.ModelSerializer):
         fields = ['pk', 'name', 'users', 'created']
 
 
+class ProjectListSerializer(ProjectSerializer):
+    users = UserSummarySerializer(read_only=True, many=True)
+
+
 class ProjectChangeOwnerSerializer(serializers.Serializer):
     demote_to = serializers.ChoiceField([('readonly', 'Read Only'), ('edit', 'Edit')])
 
@@ -21,8 +34,7 @@ class ProjectUpdateSerializer(serializers.Serializer):
 
 class CurrentUserProjectsRelatedField(serializers.PrimaryKeyRelatedField):
     def get_queryset(self):
-        user = self.context['request'].user
-        return Project.objects.filter(collaboration__user=user, collaboration__access_level=Perms.OWNER)
+        return Project.objects.filter(owner=self.context['request'].user)
 
 
 class CollaborationSerializer(serializers.ModelSerializer):
@@ -32,3 +44,14 @@ class CollaborationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Collaboration
         fields = ['pk', 'project', 'user', 'access_level']
+
+
+class CollaborationEntrySerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    access_level = serializers.ChoiceField([('readonly', 'Read Only'), ('edit', 'Edit')])
+
+
+class CollaborationBulkSerializer(serializers.Serializer):
+    project = CurrentUserProjectsRelatedField()
+    collaborators = serializers.ListField(child=CollaborationEntrySerializer(), required=False, max_length=1000)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
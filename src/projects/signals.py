@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from projects.access import invalidate_collaborations
+from projects.models import Collaboration, Project
+from todocs.generations import PROJECTS_SCOPE, bump_generations
+from users.models import User
+
+
+@receiver([post_save, post_delete], sender=Collaboration)
+def invalidate_collaborator_access_map(sender, instance, **kwargs):
+    invalidate_collaborations(instance.project_id, [instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=Project)
+@receiver([post_save, post_delete], sender=User)
+def invalidate_project_listing(sender, instance, **kwargs):
+    bump_generations([PROJECTS_SCOPE])
@@ -1,11 +1,39 @@
+import hashlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from rest_framework.test import APIClient
 from mixer.backend.django import mixer
 from projects.project_creator import ProjectCreator
+from projects.collaboration_bulk_editor import CollaborationBulkEditor
+from projects.project_exporter import ProjectExporter
+from projects.project_importer import ArchiveError, ProjectImporter
+from docs.attachment_creator import AttachmentCreator
+from docs.models import Attachment, Blob, Document, fs
+from docs.storage import hash_from_name
+from docs import search
 from projects.models import Project, Collaboration, Perms, OwnerMutationError
 from projects.permission import IsProjectOwner
+from projects.access import get_access_map
+from projects.checks import check_shared_cache
 from projects.views import CollaborationViewset
-from django.db.utils import IntegrityError
+from todocs.pagination import CreatedKeysetPagination
+from todocs.projections import Projection
+from todocs.routers import ReplicaRouter, read_from_replica
+from django.contrib.auth.models import Group, Permission
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.utils import IntegrityError, OperationalError
+from django.test import RequestFactory
 
 pytestmark = [pytest.mark.django_db]
 
@@ -32,6 +60,8 @@ def project():
 
 @pytest.fixture
 def owner_collaboration(api, user, project):
+    project.owner = user
+    project.save()
     return Collaboration.objects.create(user=user, project=project, access_level='owner')
 
 
@@ -45,6 +75,7 @@ def test_project_creator_service(user):
     last = Collaboration.objects.last()
     assert Project.objects.last().name == 'vasya'
     assert last.user == user and last.access_level == 'owner'
+    assert Project.objects.last().owner == user
 
 
 def test_collaboration_model_choicefields(api, user, project):
@@ -135,3 +166,642 @@ def test_collaborations_unique_constraint(owner_collaboration):
                                       project=owner_collaboration.project,
                                       access_level=Perms.READ_ONLY)
         collaboration.save()
+
+
+@pytest.fixture
+def projects_with_members():
+    projects = mixer.cycle(5).blend(Project)
+    for project in projects:
+        mixer.cycle(3).blend(Collaboration, project=project, access_level=Perms.EDIT)
+    return projects
+
+
+def test_project_list_query_count_does_not_grow_with_projects(api, projects_with_members, django_assert_num_queries):
+    with django_assert_num_queries(2):
+        request = api.get('/api/v1/projects/')
+
+    assert request.status_code == 200
+    assert [len(project['users']) for project in request.json()['results']] == [3] * 5
+    assert set(request.json()['results'][0]['users'][0]) == {'id', 'email', 'first_name', 'last_name'}
+
+
+def test_project_list_is_paginated(api, projects_with_members, monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr(CreatedKeysetPagination, 'page_size', 2)
+    listed = []
+    url = '/api/v1/projects/'
+    while url:
+        with django_assert_num_queries(2):
+            page = api.get(url).json()
+        listed += [project['pk'] for project in page['results']]
+        url = page['next']
+
+    assert listed == [project.pk for project in projects_with_members]
+
+
+def test_project_update_query_count_does_not_grow_with_members(api, projects_with_members,
+                                                              django_assert_num_queries):
+    project = projects_with_members[0]
+    mixer.cycle(5).blend(Collaboration, project=project, access_level=Perms.EDIT)
+
+    with django_assert_num_queries(9):
+        request = api.patch(f'/api/v1/projects/{project.pk}/', {'name': 'Renamed'})
+
+    assert request.status_code == 200
+    assert request.json()['name'] == 'Renamed'
+    assert len(request.json()['users']) == 8
+
+
+def test_project_list_sparse_fieldset_skips_members(api, projects_with_members, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        request = api.get('/api/v1/projects/?fields=pk,name')
+
+    assert request.status_code == 200
+    assert set(request.json()['results'][0]) == {'pk', 'name'}
+
+
+def test_project_list_sparse_fieldset_expand_users(api, projects_with_members, django_assert_num_queries):
+    with django_assert_num_queries(2):
+        request = api.get('/api/v1/projects/?fields=pk&expand=users')
+
+    assert set(request.json()['results'][0]) == {'pk', 'users'}
+
+
+def test_access_map_is_cached_across_requests(owner_collaboration, django_assert_num_queries):
+    assert get_access_map(owner_collaboration.user) == {owner_collaboration.project_id: Perms.OWNER}
+
+    with django_assert_num_queries(0):
+        assert get_access_map(owner_collaboration.user) == {owner_collaboration.project_id: Perms.OWNER}
+
+
+def test_process_local_cache_fails_checks_outside_debug(settings):
+    settings.DEBUG = False
+    assert [error.id for error in check_shared_cache(None)] == ['projects.E001']
+
+    settings.CACHES = {'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'}}
+    assert check_shared_cache(None) == []
+
+
+def test_process_local_cache_is_allowed_in_debug(settings):
+    settings.DEBUG = True
+    assert check_shared_cache(None) == []
+
+
+def test_access_map_invalidated_by_collaboration_changes(owner_collaboration):
+    get_access_map(owner_collaboration.user)
+    another_project = mixer.blend(Project)
+    Collaboration.objects.create(user=owner_collaboration.user, project=another_project, access_level=Perms.EDIT)
+    owner_collaboration.delete()
+
+    assert get_access_map(owner_collaboration.user) == {another_project.pk: Perms.EDIT}
+
+
+def test_is_project_owner_permission_checks_cost_no_queries(api, owner_collaboration, django_assert_num_queries):
+    members = mixer.cycle(10).blend(Collaboration, project=owner_collaboration.project, access_level=Perms.EDIT)
+    request = api.get('/collaborations/1/')
+    request.user = owner_collaboration.user
+    IsProjectOwner().has_object_permission(request, CollaborationViewset, members[0])
+
+    with django_assert_num_queries(0):
+        assert all(IsProjectOwner().has_object_permission(request, CollaborationViewset, member) for member in members)
+
+
+def test_collaboration_object_permission_needs_no_project_query(owner_collaboration, member_collaboration,
+                                                                  django_assert_num_queries):
+    request = RequestFactory().delete(f'/api/v1/collaborations/{member_collaboration.pk}/')
+    request.user = owner_collaboration.user
+    view = CollaborationViewset(request=request, kwargs={}, action='destroy')
+    collaboration = view.get_queryset().get(pk=member_collaboration.pk)
+
+    with django_assert_num_queries(0):
+        assert IsProjectOwner().has_object_permission(request, view, collaboration)
+
+
+def test_change_owner_demotes_then_promotes(owner_collaboration, member_collaboration, django_assert_num_queries):
+    with django_assert_num_queries(6):  # savepoint, locked project read, demote, promote, owner update, release
+        member_collaboration.project.change_owner(member_collaboration, Perms.READ_ONLY)
+
+    assert Collaboration.objects.get(pk=owner_collaboration.pk).access_level == Perms.READ_ONLY
+    assert Collaboration.objects.get(pk=member_collaboration.pk).access_level == Perms.OWNER
+    assert Project.objects.get(pk=owner_collaboration.project_id).owner_id == member_collaboration.user_id
+
+
+def test_change_owner_rejects_collaboration_from_another_project(owner_collaboration):
+    stranger = mixer.blend(Collaboration, access_level=Perms.EDIT)
+    with pytest.raises(OwnerMutationError):
+        owner_collaboration.project.change_owner(stranger, Perms.EDIT)
+
+    assert Collaboration.objects.get(pk=owner_collaboration.pk).access_level == Perms.OWNER
+
+
+def test_edit_collaborator_is_single_update(owner_collaboration, member_collaboration, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        member_collaboration.project.edit_collaborator(member_collaboration.user, Perms.READ_ONLY)
+
+
+def test_edit_missing_collaborator(owner_collaboration, another_user):
+    with pytest.raises(Collaboration.DoesNotExist):
+        owner_collaboration.project.edit_collaborator(another_user, Perms.READ_ONLY)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_ownership_transfers_leave_single_owner():
+    project = mixer.blend(Project, owner=mixer.blend('users.User'))
+    Collaboration.objects.create(user=project.owner, project=project, access_level=Perms.OWNER)
+    candidates = mixer.cycle(8).blend(Collaboration, project=project, access_level=Perms.EDIT)
+    barrier = threading.Barrier(len(candidates))
+
+    def transfer(collaboration):
+        barrier.wait()
+        try:
+            # Shared-cache SQLite reports table locks at once instead of waiting, so a lost race is retried.
+            for attempt in range(5):
+                try:
+                    project.change_owner(collaboration, Perms.EDIT)
+                    return True
+                except OperationalError:
+                    time.sleep(random.random() * 0.01 * (attempt + 1))
+            return False
+        except OwnerMutationError:
+            return False
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        results = list(executor.map(transfer, candidates))
+
+    owners = Collaboration.objects.filter(project=project, access_level=Perms.OWNER)
+    assert any(results)
+    assert owners.count() == 1
+    assert Project.objects.get(pk=project.pk).owner_id == owners.get().user_id
+    assert Collaboration.objects.filter(project=project).count() == len(candidates) + 1
+
+
+def test_bulk_collaborations(api, owner_collaboration, member_collaboration):
+    newcomers = mixer.cycle(3).blend('users.User')
+    api.force_authenticate(user=owner_collaboration.user)
+    request = api.post('/api/v1/collaborations/bulk/', {
+        'project': owner_collaboration.project.pk,
+        'collaborators': [{'user': user.pk, 'access_level': Perms.READ_ONLY} for user in newcomers[:2]],
+        'remove': [member_collaboration.user.pk],
+    }, format='json')
+
+    assert request.status_code == 200
+    assert [result['status'] for result in request.json()['results']] == ['created', 'created', 'removed']
+    assert set(owner_collaboration.project.users.all()) == {owner_collaboration.user, *newcomers[:2]}
+
+
+def test_bulk_collaborations_is_all_or_nothing(api, owner_collaboration, another_user):
+    api.force_authenticate(user=owner_collaboration.user)
+    request = api.post('/api/v1/collaborations/bulk/', {
+        'project': owner_collaboration.project.pk,
+        'collaborators': [{'user': another_user.pk, 'access_level': Perms.EDIT},
+                          {'user': owner_collaboration.user.pk, 'access_level': Perms.EDIT}],
+    }, format='json')
+
+    assert request.status_code == 400
+    assert [result['status'] for result in request.json()['results']] == ['created', 'error']
+    assert not Collaboration.objects.filter(user=another_user).exists()
+
+
+def test_bulk_collaborations_reports_concurrently_added_collaborators(owner_collaboration, monkeypatch):
+    project = owner_collaboration.project
+    newcomers = mixer.cycle(2).blend('users.User')
+    plan = CollaborationBulkEditor.plan
+
+    def plan_then_race(editor):
+        planned = plan(editor)
+        project.add_collaborator(newcomers[1], Perms.EDIT)
+        return planned
+    monkeypatch.setattr(CollaborationBulkEditor, 'plan', plan_then_race)
+
+    applied, results = CollaborationBulkEditor(project, [{'user': user.pk, 'access_level': Perms.READ_ONLY}
+                                                         for user in newcomers])()
+
+    assert applied is False
+    assert [result['status'] for result in results] == ['created', 'error']
+    assert not Collaboration.objects.filter(user=newcomers[0]).exists()
+    assert Collaboration.objects.get(user=newcomers[1]).access_level == Perms.EDIT
+
+
+def test_bulk_collaborations_query_count_does_not_grow(owner_collaboration, django_assert_max_num_queries):
+    users = mixer.cycle(200).blend('users.User')
+    mixer.cycle(50).blend(Collaboration, project=owner_collaboration.project, access_level=Perms.EDIT,
+                          user=(user for user in users[:50]))
+    collaborators = [{'user': user.pk, 'access_level': Perms.READ_ONLY} for user in users[:150]]
+
+    with django_assert_max_num_queries(10):
+        applied, _ = CollaborationBulkEditor(owner_collaboration.project, collaborators,
+                                             [user.pk for user in users[150:]])()
+
+    assert applied is False
+    with django_assert_max_num_queries(10):
+        applied, _ = CollaborationBulkEditor(owner_collaboration.project, collaborators)()
+
+    assert applied is True
+    assert Collaboration.objects.filter(project=owner_collaboration.project, access_level=Perms.READ_ONLY).count() == 150
+
+
+def test_collaboration_list_answers_304_until_changed(api, owner_collaboration, another_user,
+                                                      django_assert_num_queries):
+    api.force_authenticate(user=owner_collaboration.user)
+    first = api.get('/api/v1/collaborations/')
+    assert first.status_code == 200
+    assert 'private' in first['Cache-Control']
+
+    with django_assert_num_queries(0):
+        repeated = api.get('/api/v1/collaborations/', HTTP_IF_NONE_MATCH=first['ETag'])
+    assert repeated.status_code == 304
+    assert repeated['ETag'] == first['ETag']
+
+    owner_collaboration.project.add_collaborator(another_user, Perms.EDIT)
+    changed = api.get('/api/v1/collaborations/', HTTP_IF_NONE_MATCH=first['ETag'])
+    assert changed.status_code == 200
+    assert changed['ETag'] != first['ETag']
+    assert len(changed.json()['results']) == 2
+
+
+def test_project_etag_is_per_user(api, owner_collaboration, member_collaboration):
+    api.force_authenticate(user=owner_collaboration.user)
+    etag = api.get('/api/v1/projects/')['ETag']
+
+    api.force_authenticate(user=member_collaboration.user)
+    assert api.get('/api/v1/projects/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_cached_collaboration_list_skips_the_database(api, owner_collaboration, member_collaboration, another_user,
+                                                      django_assert_num_queries):
+    api.force_authenticate(user=owner_collaboration.user)
+    first = api.get('/api/v1/collaborations/')
+
+    with django_assert_num_queries(0):
+        cached = api.get('/api/v1/collaborations/')
+    assert cached.status_code == 200
+    assert cached.content == first.content
+    assert sorted(cached.items()) == sorted(first.items())
+    assert {'Content-Type', 'Vary', 'Allow', 'ETag'} <= {header for header, _ in cached.items()}
+
+    owner_collaboration.project.edit_collaborator(member_collaboration.user, Perms.READ_ONLY)
+    changed = api.get('/api/v1/collaborations/')
+    assert changed.content != first.content
+    assert [row['access_level'] for row in changed.json()['results']] == [Perms.OWNER, Perms.READ_ONLY]
+
+
+def test_response_cache_skips_browsable_api(api, owner_collaboration, django_assert_num_queries):
+    api.force_authenticate(user=owner_collaboration.user)
+    api.get('/api/v1/projects/', HTTP_ACCEPT='text/html')
+
+    with django_assert_num_queries(2):
+        api.get('/api/v1/projects/', HTTP_ACCEPT='text/html')
+
+
+@pytest.fixture
+def exported_project(owner_collaboration, member_collaboration):
+    project = owner_collaboration.project
+    Document.objects.create(project=project, type='MD', text='# Notes')
+    Document.objects.create(project=project, type='DOC', text='plain ' * 2000)
+    Attachment.objects.create(project=project, file_name='blob.bin', file=ContentFile(os.urandom(300 * 1024), name='blob.bin'))
+    return project
+
+
+def test_project_export_endpoint_streams_zip(api, exported_project, owner_collaboration):
+    api.force_authenticate(user=owner_collaboration.user)
+    response = api.get(f'/api/v1/projects/{exported_project.pk}/export/')
+
+    assert response.status_code == 200
+    assert response.streaming
+    archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+    assert archive.testzip() is None
+
+    manifest = json.loads(archive.read('project.json'))
+    assert {collaborator['access_level'] for collaborator in manifest['collaborators']} == {'owner', 'edit'}
+    documents = [json.loads(line) for line in archive.read('documents.jsonl').splitlines()]
+    assert [archive.read(document['path']).decode() for document in documents] == ['# Notes', 'plain ' * 2000]
+    attachment = json.loads(archive.read('attachments.jsonl'))
+    assert archive.read(attachment['path']) == Attachment.objects.get().file.read()
+
+
+def test_project_export_requires_owner(api, exported_project, member_collaboration):
+    api.force_authenticate(user=member_collaboration.user)
+    assert api.get(f'/api/v1/projects/{exported_project.pk}/export/').status_code == 403
+
+
+def test_project_export_chunks_stay_small(exported_project):
+    chunks = list(ProjectExporter(exported_project, chunk_size=16 * 1024)())
+    assert max(len(chunk) for chunk in chunks) < 32 * 1024
+
+
+def test_export_project_command(exported_project, tmp_path):
+    output = tmp_path / 'export.zip'
+    call_command('export_project', exported_project.pk, str(output), stdout=io.StringIO())
+
+    markdown = Document.objects.get(type='MD')
+    assert f'documents/{markdown.pk}.md' in zipfile.ZipFile(output).namelist()
+
+
+@pytest.fixture
+def project_archive(exported_project):
+    return io.BytesIO(b''.join(ProjectExporter(exported_project)()))
+
+
+def test_project_import_round_trip(project_archive, exported_project, another_user):
+    counts = []
+    serializer = ProjectImporter(project_archive, another_user, progress=lambda stage, done: counts.append((stage, done)))()
+
+    imported = serializer.instance
+    assert imported.name == exported_project.name
+    assert Collaboration.objects.get(project=imported).user == another_user
+    assert sorted(Document.objects.filter(project=imported).values_list('type', 'text')) == \
+        sorted(Document.objects.filter(project=exported_project).values_list('type', 'text'))
+    assert counts == [('documents', 2), ('attachments', 1)]
+
+    # The blob is already stored, so it is referenced rather than written again.
+    original, copy = Attachment.objects.order_by('pk')
+    assert copy.file.name == original.file.name
+    assert Blob.objects.get().references == 2
+
+
+def test_project_import_indexes_documents(project_archive, another_user):
+    if not search.is_supported():
+        pytest.skip('full-text search needs SQLite FTS5')
+
+    imported = ProjectImporter(project_archive, another_user)().instance
+    assert [document.text for document in search.search_documents(imported.pk, 'Notes', 10, 0)] == ['# Notes']
+
+
+def test_project_import_query_count_does_not_grow(project, another_user, django_assert_max_num_queries):
+    mixer.cycle(300).blend(Document, project=project, type='DOC', text=(f'body {n}' for n in range(300)))
+    archive = io.BytesIO(b''.join(ProjectExporter(project)()))
+
+    with django_assert_max_num_queries(20):
+        serializer = ProjectImporter(archive, another_user, batch_size=100)()
+    assert Document.objects.filter(project=serializer.instance).count() == 300
+
+
+def test_project_import_endpoint(api, project_archive, another_user):
+    api.force_authenticate(user=another_user)
+    project_archive.name = 'export.zip'
+
+    response = api.post('/api/v1/projects/import/', {'archive': project_archive}, format='multipart')
+    assert response.status_code == 201
+    assert response.json()['imported'] == {'documents': 2, 'attachments': 1, 'blobs_written': 0}
+
+
+def test_project_import_rejects_invalid_archive(api, another_user):
+    api.force_authenticate(user=another_user)
+    archive = io.BytesIO(b'not a zip')
+    archive.name = 'export.zip'
+
+    response = api.post('/api/v1/projects/import/', {'archive': archive}, format='multipart')
+    assert response.status_code == 400
+    assert not Project.objects.filter(collaboration__user=another_user).exists()
+
+
+def test_import_project_command(exported_project, another_user, tmp_path):
+    path = tmp_path / 'export.zip'
+    call_command('export_project', exported_project.pk, str(path), stdout=io.StringIO())
+
+    output = io.StringIO()
+    call_command('import_project', str(path), another_user.email, stdout=output)
+    assert 'Imported 2 documents' in output.getvalue()
+    assert Project.objects.count() == 2
+
+
+def test_project_import_stores_missing_blobs(project_archive, another_user):
+    name = Attachment.objects.get().file.name
+    content = fs.open(name).read()
+    Blob.objects.all().delete()
+    fs.delete(name)
+
+    importer = ProjectImporter(project_archive, another_user)
+    importer()
+
+    assert importer.counts['blobs_written'] == 1
+    assert Blob.objects.get().name == name
+    assert fs.open(name).read() == content
+
+
+def build_archive(attachments):
+    # attachments maps an index row to the bytes stored at its path, None leaves the member out.
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as output:
+        output.writestr('project.json', json.dumps({'name': 'imported'}))
+        output.writestr('documents.jsonl', '')
+        output.writestr('attachments.jsonl', ''.join(json.dumps(row) + '\n' for row, _ in attachments))
+        for row, content in attachments:
+            if content is not None:
+                output.writestr(row['path'], content)
+    archive.seek(0)
+    return archive
+
+
+def test_project_import_ignores_archive_hashes(project, another_user):
+    secret = AttachmentCreator(ContentFile(b'secret', name='secret.txt'), project.pk)().instance
+    archive = build_archive([({'file_name': 'secret.txt', 'hash': hash_from_name(secret.file.name),
+                               'path': 'attachments/1/secret.txt'}, b'forged')])
+
+    imported = ProjectImporter(archive, another_user)().instance
+
+    attachment = Attachment.objects.get(project=imported)
+    assert attachment.file.name != secret.file.name
+    assert attachment.file.read() == b'forged'
+    assert Blob.objects.get(name=secret.file.name).references == 1
+
+
+def test_project_import_rollback_removes_written_blobs(project, another_user, settings, tmp_path):
+    settings.FILE_UPLOAD_TEMP_DIR = str(tmp_path / 'uploads')
+    shared = AttachmentCreator(ContentFile(b'shared', name='shared.txt'), project.pk)().instance
+    archive = build_archive([
+        ({'file_name': 'new.txt', 'path': 'attachments/1/new.txt'}, b'new'),
+        ({'file_name': 'shared.txt', 'path': 'attachments/2/shared.txt'}, b'shared'),
+        ({'file_name': 'missing.txt', 'path': 'attachments/3/missing.txt'}, None),
+    ])
+
+    with pytest.raises(ArchiveError):
+        ProjectImporter(archive, another_user)()
+
+    assert not Project.objects.filter(name='imported').exists()
+    assert fs.exists(shared.file.name)
+    assert not fs.exists(fs.get_hashed_name('new.txt', hashlib.sha1(b'new').hexdigest()))
+    assert os.listdir(tmp_path / 'uploads') == []
+
+
+def test_profiling_is_off_by_default(api, owner_collaboration):
+    api.force_authenticate(user=owner_collaboration.user)
+    assert 'Server-Timing' not in api.get('/api/v1/collaborations/')
+
+
+def test_profiled_request_reports_server_timing(api, owner_collaboration, settings, caplog):
+    settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+    api.force_authenticate(user=owner_collaboration.user)
+
+    with caplog.at_level('INFO', logger='todocs.profiling'):
+        response = api.get('/api/v1/collaborations/')
+
+    metrics = {metric.split(';')[0]: metric for metric in response['Server-Timing'].split(', ')}
+    assert set(metrics) == {'db', 'permissions', 'serializer', 'total'}
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['path'] == '/api/v1/collaborations/'
+    assert f'desc="{record["queries"]} queries"' in metrics['db']
+    assert record['repeated_queries'] == []
+
+
+def test_profiled_request_flags_repeated_queries(api, settings, caplog, monkeypatch):
+    # Serializing users instance by instance loads their groups and permissions one query each.
+    monkeypatch.setattr(Projection, 'for_serializer', classmethod(lambda cls, serializer, queryset: None))
+    settings.REQUEST_PROFILING_SAMPLE_RATE = 1
+    settings.REQUEST_PROFILING_REPEATED_QUERY_THRESHOLD = 5
+    mixer.cycle(6).blend('users.User')
+
+    with caplog.at_level('INFO', logger='todocs.profiling'):
+        api.get('/api/v1/users/')
+
+    record = caplog.records[-1]
+    assert record.levelname == 'WARNING'
+    assert [entry['count'] for entry in json.loads(record.getMessage())['repeated_queries']] == [6, 6]
+
+
+@pytest.fixture
+def routed_reads(settings, monkeypatch):
+    # Records where reads would go while still serving them from the single test database.
+    settings.DATABASE_REPLICAS = ['replica']
+    routed = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def spy(self, model, **hints):
+        routed.append(db_for_read(self, model, **hints))
+        return 'default'
+
+    monkeypatch.setattr(ReplicaRouter, 'db_for_read', spy)
+    return routed
+
+
+def test_safe_actions_read_from_replica(api, owner_collaboration, routed_reads, settings):
+    settings.DATABASE_REPLICA_MAX_LAG = 0
+    api.force_authenticate(user=owner_collaboration.user)
+    api.get('/api/v1/collaborations/')
+    api.get(f'/api/v1/projects/{owner_collaboration.project.pk}/')
+
+    assert routed_reads and set(routed_reads) == {'replica'}
+
+
+def test_recently_changed_reads_use_primary(api, owner_collaboration, routed_reads, settings):
+    # The collaboration was just written, so a replica could still serve the body without it under the new ETag.
+    api.force_authenticate(user=owner_collaboration.user)
+    api.get('/api/v1/collaborations/')
+
+    assert routed_reads and set(routed_reads) == {'default'}
+
+
+def test_writes_stick_to_primary(api, owner_collaboration, another_user, routed_reads):
+    api.force_authenticate(user=owner_collaboration.user)
+    response = api.post('/api/v1/collaborations/', {'project': owner_collaboration.project.pk, 'user': another_user.pk,
+                                                    'access_level': Perms.EDIT})
+
+    assert response.status_code == 201
+    assert set(routed_reads) == {'default'}
+
+
+def test_reads_after_a_write_use_primary(routed_reads):
+    token = read_from_replica.set(True)
+    try:
+        Project.objects.exists()
+        Project.objects.create(name='written')
+        Project.objects.exists()
+    finally:
+        read_from_replica.reset(token)
+
+    assert routed_reads == ['replica', 'default']
+
+
+def test_second_owner_is_rejected(owner_collaboration, another_user):
+    with pytest.raises(IntegrityError):
+        Collaboration.objects.create(user=another_user, project=owner_collaboration.project, access_level=Perms.OWNER)
+
+
+def test_change_owner_to_self_keeps_owner(owner_collaboration):
+    with pytest.raises(OwnerMutationError):
+        owner_collaboration.project.change_owner(owner_collaboration, Perms.EDIT)
+
+    assert Collaboration.objects.get(pk=owner_collaboration.pk).access_level == Perms.OWNER
+
+
+@pytest.mark.parametrize('queryset', [
+    lambda project: Collaboration.objects.filter(project=project, access_level=Perms.OWNER),
+    lambda project: Collaboration.objects.filter(user=1).values_list('project_id', 'access_level'),
+    lambda project: Document.objects.filter(project=project).order_by('created', 'pk'),
+    lambda project: Attachment.objects.filter(project=project).order_by('created', 'pk'),
+], ids=['owner lookup', 'access map', 'document list', 'attachment list'])
+def test_hot_lookups_use_indexes(queryset, project):
+    if connection.vendor != 'sqlite':
+        pytest.skip('asserts on SQLite query plans')
+
+    plan = queryset(project).explain()
+    assert 'SEARCH' in plan
+    assert 'SCAN' not in plan and 'TEMP B-TREE' not in plan
+
+
+def test_owner_checks_read_the_project_row(owner_collaboration, member_collaboration, django_assert_num_queries):
+    project = owner_collaboration.project
+    with django_assert_num_queries(0):
+        with pytest.raises(OwnerMutationError):
+            project.edit_collaborator(owner_collaboration.user, Perms.READ_ONLY)
+        with pytest.raises(OwnerMutationError):
+            project.remove_collaborator(owner_collaboration.user)
+
+
+def test_collaboration_project_choices_are_owned_projects(api, owner_collaboration, member_collaboration, another_user):
+    api.force_authenticate(user=member_collaboration.user)
+    request = api.post('/api/v1/collaborations/', {'user': another_user.pk, 'project': owner_collaboration.project_id,
+                                                   'access_level': Perms.EDIT})
+    assert request.status_code == 400
+
+    api.force_authenticate(user=owner_collaboration.user)
+    request = api.post('/api/v1/collaborations/', {'user': another_user.pk, 'project': owner_collaboration.project_id,
+                                                   'access_level': Perms.EDIT})
+    assert request.status_code == 201
+
+
+def test_project_owner_is_cleared_with_the_user(owner_collaboration):
+    owner_collaboration.user.delete()
+    assert Project.objects.get(pk=owner_collaboration.project_id).owner is None
+    assert not Project.objects.inconsistent_owners().exists()
+
+
+def test_check_project_owners_command(owner_collaboration, member_collaboration):
+    call_command('check_project_owners', stdout=io.StringIO())
+
+    Project.objects.filter(pk=owner_collaboration.project_id).update(owner=member_collaboration.user)
+    ownerless = mixer.blend(Project)
+    Collaboration.objects.create(user=member_collaboration.user, project=ownerless, access_level=Perms.OWNER)
+    with pytest.raises(CommandError, match='2 projects'):
+        call_command('check_project_owners', stdout=io.StringIO())
+
+    call_command('check_project_owners', '--fix', stdout=io.StringIO())
+    assert Project.objects.get(pk=owner_collaboration.project_id).owner == owner_collaboration.user
+    assert Project.objects.get(pk=ownerless.pk).owner == member_collaboration.user
+    assert not Project.objects.inconsistent_owners().exists()
+
+
+def test_collaboration_list_fast_path_matches_serializer(api, owner_collaboration, reference_content,
+                                                         django_assert_num_queries):
+    mixer.cycle(4).blend(Collaboration, project=owner_collaboration.project, access_level=Perms.READ_ONLY)
+    api.force_authenticate(user=owner_collaboration.user)
+    url = '/api/v1/collaborations/?page_size=3'
+
+    with django_assert_num_queries(2):  # access map, page
+        content = api.get(url).content
+    assert content == reference_content(api, url)
+
+    next_page = json.loads(content)['next']
+    assert api.get(next_page).content == reference_content(api, next_page)
+
+
+def test_user_list_fast_path_matches_serializer(api, reference_content, django_assert_num_queries):
+    users = mixer.cycle(5).blend('users.User', first_name='Zoë\u2028')
+    group = Group.objects.create(name='editors')
+    users[0].groups.add(group)
+    users[1].user_permissions.add(*Permission.objects.all()[:3])
+
+    with django_assert_num_queries(3):  # users, groups, permissions
+        content = api.get('/api/v1/users/').content
+    assert content == reference_content(api, '/api/v1/users/')
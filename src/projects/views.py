@@ -1,36 +1,127 @@
 from rest_framework import viewsets, status
 from projects.models import Project, Collaboration
-from projects.serializer import ProjectSerializer, CollaborationSerializer, ProjectChangeOwnerSerializer, ProjectUpdateSerializer
+from projects.serializer import ProjectSerializer, ProjectListSerializer, CollaborationSerializer, ProjectChangeOwnerSerializer, ProjectUpdateSerializer, \
+    CollaborationBulkSerializer
 from rest_framework.response import Response
 from projects.project_creator import ProjectCreator
+from projects.collaboration_bulk_editor import CollaborationBulkEditor
 from rest_framework.decorators import action
-from projects.permission import IsProjectOwner
+from projects.permission import IsProjectOwner, OwnsProject
+from projects.project_exporter import ProjectExporter
+from projects.project_importer import ProjectImporter, ArchiveError
+from projects.access import get_request_access_map, access_map_scope
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Prefetch
-
-
-class ProjectViewset(viewsets.ModelViewSet):
+from django.http import StreamingHttpResponse
+from users.models import User
+from users.serializer import UserSummarySerializer
+from todocs.pagination import CreatedKeysetPagination, KeysetPagination
+from todocs.conditional import ConditionalGetMixin
+from todocs.profiling import ProfiledViewMixin
+from todocs.projections import ValuesListMixin
+from todocs.routers import ReplicaReadMixin
+from todocs.generations import PROJECTS_SCOPE, project_scope
+
+
+class ProjectViewset(ProfiledViewMixin, ReplicaReadMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
+    pagination_class = CreatedKeysetPagination
+    # Also the project_pk pattern of the nested document and attachment routes.
+    lookup_value_regex = r'\d+'
+
+    def get_generation_scopes(self):
+        return [PROJECTS_SCOPE]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        fields = self.get_requested_fields()
+        if fields is None or 'users' in fields:
+            if self.action == 'list':
+                # Listed members are summaries: one query for the members of the whole page.
+                members = User.objects.only(*UserSummarySerializer.Meta.fields)
+            else:
+                members = User.objects.prefetch_related('groups', 'user_permissions')
+            queryset = queryset.prefetch_related(Prefetch('users', members))
+
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ProjectListSerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_requested_fields(self):
+        if self.request is None or not self.request.query_params.get('fields'):
+            return None
+
+        requested = self.request.query_params['fields'].split(',')
+        requested += self.request.query_params.get('expand', '').split(',')
+        return {name.strip() for name in requested if name.strip()}
 
     def create(self, request, *args, **kwargs):
         serializer = ProjectCreator(request.data['name'], request.user)()
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    def update(self, request, *args, **kwargs):
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=kwargs.pop('partial', False))
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
 
-class CollaborationViewset(viewsets.ModelViewSet):
+        # Saving drops the prefetched members; reloaded through get_queryset they come back with their prefetches.
+        return Response(self.get_serializer(self.get_object()).data)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAuthenticated])
+    def import_archive(self, request, *args, **kwargs):
+        if 'archive' not in request.FILES:
+            return Response({'archive': ['No archive was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = ProjectImporter(request.FILES['archive'], request.user)
+        try:
+            serializer = importer()
+        except ArchiveError as e:
+            return Response({'archive': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({**serializer.data, 'imported': importer.counts}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, permission_classes=[IsAuthenticated, OwnsProject])
+    def export(self, request, *args, **kwargs):
+        exporter = ProjectExporter(self.get_object())
+
+        response = StreamingHttpResponse(exporter(), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{exporter.filename}"'
+        return response
+
+
+class CollaborationViewset(ProfiledViewMixin, ReplicaReadMixin, ConditionalGetMixin, ValuesListMixin,
+                           viewsets.ModelViewSet):
     serializer_class = CollaborationSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Collaboration.objects.filter(project__in=self.request.user.project_set.all())\
-            .order_by('pk').prefetch_related(Prefetch('project', Project.objects.filter(users=self.request.user)))
+        access_map = get_request_access_map(self.request)
+        # IsProjectOwner reads project.owner_id; .values() listings drop the join.
+        return Collaboration.objects.filter(project__in=access_map).select_related('project').order_by('pk')
+
+    def get_generation_scopes(self):
+        access_map = get_request_access_map(self.request)
+        return [access_map_scope(self.request.user.pk)] + \
+            [project_scope(project_id, 'collaborations') for project_id in access_map]
 
     def get_serializer_class(self):
         if self.action == "update":
             return ProjectUpdateSerializer
         elif self.action == "transfer_ownership":
             return ProjectChangeOwnerSerializer
+        elif self.action == "bulk":
+            return CollaborationBulkSerializer
         return CollaborationSerializer
 
     def get_permissions(self):
@@ -76,3 +167,15 @@ class CollaborationViewset(viewsets.ModelViewSet):
 
         collaboration.project.change_owner(collaboration, demote_to)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], serializer_class=CollaborationBulkSerializer)
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        applied, results = CollaborationBulkEditor(serializer.validated_data['project'],
+                                                   serializer.validated_data.get('collaborators', []),
+                                                   serializer.validated_data.get('remove', []))()
+
+        response_status = status.HTTP_200_OK if applied else status.HTTP_400_BAD_REQUEST
+        return Response({'applied': applied, 'results': results}, status=response_status)
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todocs.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+from todocs.streaming import StreamingASGIHandler  # noqa: E402
+
+# Same as get_asgi_application(), with a handler that awaits AsyncFileResponse bodies.
+application = StreamingASGIHandler()
@@ -0,0 +1,79 @@
+import hashlib
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from todocs.generations import changed_within, get_generations
+from todocs.routers import read_from_replica
+
+
+class ConditionalGetMixin:
+    # ETags for list/retrieve come from generation counters bumped by model signals,
+    # so an unchanged resource answers 304 before the queryset or serializer run. The rendered
+    # body is cached under the same ETag, which lets any client of that user skip them as well.
+    cached_formats = ('json',)
+
+    def get_generation_scopes(self):
+        raise NotImplementedError
+
+    def get_etag(self, request, generations):
+        validator = '|'.join([
+            request.get_full_path(),
+            str(request.user.pk),
+            request.accepted_media_type or '',
+            *(f'{scope}={generation}' for scope, generation in sorted(generations.items())),
+        ])
+        return f'"{hashlib.sha1(validator.encode("utf-8")).hexdigest()}"'
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        generations = get_generations(self.get_generation_scopes())
+        if changed_within(generations.values(), settings.DATABASE_REPLICA_MAX_LAG):
+            # A replica may not have applied the latest write yet, and the ETag would vouch for its stale body.
+            read_from_replica.set(False)
+
+        etag = self.get_etag(request, generations)
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = self.cached_response(etag, handler, request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def cached_response(self, etag, handler, request, *args, **kwargs):
+        if not settings.RESPONSE_CACHE_TIMEOUT or request.accepted_renderer.format not in self.cached_formats:
+            return handler(request, *args, **kwargs)
+
+        key = f'response:{etag[1:-1]}'
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers:
+                response[header] = value
+            return response
+
+        # Misses may read from a replica: conditional_response has already sent recently changed scopes to the primary.
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response.add_post_render_callback(partial(self.store_response, key))
+        return response
+
+    @staticmethod
+    def store_response(key, response):
+        # Rendered before response middleware runs, so these are the view's own headers (Content-Type, Vary, Allow).
+        if len(response.content) <= settings.RESPONSE_CACHE_MAX_BYTES:
+            cache.set(key, (response.content, list(response.items())), settings.RESPONSE_CACHE_TIMEOUT)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
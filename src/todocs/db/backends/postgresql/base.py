@@ -0,0 +1,23 @@
+from django.db.backends.postgresql import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Backport of CONN_HEALTH_CHECKS from Django 4.1: a persistent connection is checked with is_usable()
+    # the first time a request uses it, so a connection dropped by the server is replaced instead of erroring.
+    health_check_done = False
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if self.settings_dict.get('CONN_HEALTH_CHECKS') and self.connection is not None \
+                and not self.health_check_done and not self.in_atomic_block:
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
@@ -0,0 +1,21 @@
+from django.db.backends.sqlite3 import base
+
+# WAL lets readers proceed while a writer commits; NORMAL only syncs at checkpoints in WAL mode,
+# which stays durable against application crashes.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Applies DEFAULT_PRAGMAS, overridden by the database's PRAGMAS setting, to every new connection.
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for pragma, value in {**DEFAULT_PRAGMAS, **self.settings_dict.get('PRAGMAS', {})}.items():
+            connection.execute(f'PRAGMA {pragma} = {value}')
+        return connection
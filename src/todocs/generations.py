@@ -0,0 +1,55 @@
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Generation counters are tokens in the shared cache. Anything derived from a
+# scope (cached maps, ETags, cached responses) embeds its token and is implicitly
+# invalidated when the scope is bumped. A token is the time_ns of the last bump,
+# so it also tells how recently the scope changed.
+
+PROJECTS_SCOPE = 'projects'
+
+
+def project_scope(project_id, name):
+    return f'project:{project_id}:{name}'
+
+
+def _key(scope):
+    return f'generation:{scope}'
+
+
+def get_generations(scopes: Iterable[str]) -> Dict[str, int]:
+    scopes = list(scopes)
+    found = cache.get_many([_key(scope) for scope in scopes])
+
+    generations = {}
+    for scope in scopes:
+        generation = found.get(_key(scope))
+        if generation is None:
+            cache.add(_key(scope), time.time_ns(), None)
+            generation = cache.get(_key(scope))
+        generations[scope] = generation
+    return generations
+
+
+def get_generation(scope: str) -> int:
+    return get_generations([scope])[scope]
+
+
+def changed_within(generations: Iterable[int], seconds: float) -> bool:
+    cutoff = time.time_ns() - int(seconds * 1e9)
+    return any(generation > cutoff for generation in generations)
+
+
+def bump_generations(scopes: Iterable[str]):
+    scopes = set(scopes)
+
+    def bump():
+        cache.set_many({_key(scope): time.time_ns() for scope in scopes}, None)
+
+    # Bump again once the transaction commits so anything cached from the
+    # pre-commit state by a concurrent request does not outlive it.
+    bump()
+    transaction.on_commit(bump)
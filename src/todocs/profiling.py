@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger('todocs.profiling')
+
+current_profile = ContextVar('current_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+        self.timings = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            # Parameters are passed separately, so identical SQL text means the same query shape.
+            self.statements[sql] += 1
+
+    def measure(self, name, func, *args, **kwargs):
+        # Time spent in queries is already reported as db, so it is left out of the phase.
+        started, db_time = time.perf_counter(), self.db_time
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.timings[name] += (time.perf_counter() - started) - (self.db_time - db_time)
+
+    def repeated_queries(self):
+        threshold = settings.REQUEST_PROFILING_REPEATED_QUERY_THRESHOLD
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self, total):
+        metrics = [f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries"']
+        metrics += [f'{name};dur={duration * 1000:.2f}' for name, duration in sorted(self.timings.items())]
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+def profiled(name, func, *args, **kwargs):
+    profile = current_profile.get()
+    if profile is None:
+        return func(*args, **kwargs)
+    return profile.measure(name, func, *args, **kwargs)
+
+
+def profile_queries(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile.execute(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_profiler(sender, connection, **kwargs):
+    # Connections are per thread, and async views run their ORM work in sync_to_async threads. So every
+    # connection carries the wrapper, which reports to the profile of the request in context.
+    if profile_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, profile_queries)
+
+
+class RequestProfilingMiddleware:
+    # Samples REQUEST_PROFILING_SAMPLE_RATE of requests; unsampled requests pay for one comparison and, per query,
+    # one context variable lookup.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Lets the ASGI handler await this middleware directly, as it does for MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        if not self.is_sampled():
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        with self.profiling(profile):
+            response = self.get_response(request)
+        return self.finish(request, response, profile)
+
+    async def acall(self, request):
+        if not self.is_sampled():
+            return await self.get_response(request)
+
+        profile = RequestProfile()
+        with self.profiling(profile):
+            response = await self.get_response(request)
+        return self.finish(request, response, profile)
+
+    @staticmethod
+    def is_sampled():
+        rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    @contextmanager
+    def profiling(self, profile):
+        token = current_profile.set(profile)
+        try:
+            # Connections opened before this module was imported missed connection_created.
+            for connection in connections.all():
+                install_query_profiler(None, connection)
+            yield
+        finally:
+            current_profile.reset(token)
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        response['Server-Timing'] = profile.server_timing(total)
+        self.log(request, response, profile, total)
+        return response
+
+    def log(self, request, response, profile, total):
+        repeated = profile.repeated_queries()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(profile.db_time * 1000, 2),
+            'queries': profile.queries,
+            **{f'{name}_ms': round(duration * 1000, 2) for name, duration in profile.timings.items()},
+            'repeated_queries': [{'sql': sql, 'count': count} for sql, count in repeated],
+        }
+        logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(record))
+
+
+class ProfiledViewMixin:
+    # Attributes permission checks and serialization to the sampled request's profile.
+
+    def check_permissions(self, request):
+        return profiled('permissions', super().check_permissions, request)
+
+    def check_object_permissions(self, request, obj):
+        return profiled('permissions', super().check_object_permissions, request, obj)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_profile.get() is not None:
+            to_representation, is_valid = serializer.to_representation, serializer.is_valid
+            serializer.to_representation = lambda instance: profiled('serializer', to_representation, instance)
+            serializer.is_valid = lambda *args, **kwargs: profiled('serializer', is_valid, *args, **kwargs)
+        return serializer
@@ -0,0 +1,148 @@
+from operator import itemgetter
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from todocs.profiling import profiled
+
+# Serializer fields whose representation of a .values() value is the value itself.
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField, serializers.FloatField,
+                serializers.ReadOnlyField)
+
+
+# Model fields whose values reach the renderer as floats.
+FLOAT_FIELDS = (models.FloatField, models.DecimalField)
+
+
+class Column:
+    def __init__(self, lookups, read, floats=False):
+        self.lookups = lookups
+        self.read = read
+        self.floats = floats
+
+
+class ManyColumn:
+    # Primary keys of a many-to-many relation, fetched for a whole page in one query.
+    def __init__(self, model_field):
+        self.model_field = model_field
+        self.lookups = ('pk',)
+        self.floats = False
+
+    def fetch(self, pks):
+        query_name = self.model_field.related_query_name()
+        related = self.model_field.related_model._default_manager.filter(**{f'{query_name}__in': pks})
+
+        by_owner = {}
+        for owner, pk in related.values_list(query_name, 'pk'):
+            by_owner.setdefault(owner, []).append(pk)
+        return by_owner
+
+
+class Projection:
+    # Builds list representations from a .values() projection instead of model instances. Only
+    # serializers made of plain columns qualify; for_serializer returns None for anything else.
+    def __init__(self, columns):
+        self.columns = columns
+        self.floats = any(column.floats for column in columns.values())
+
+    @classmethod
+    def for_serializer(cls, serializer, queryset):
+        columns = {}
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            column = cls.build_column(field, queryset)
+            if column is None:
+                return None
+            columns[name] = column
+        return cls(columns)
+
+    @staticmethod
+    def build_column(field, queryset):
+        if '.' in field.source or field.source == '*':
+            return None
+        if field.source in queryset.query.annotations:
+            model_field = None
+            floats = isinstance(queryset.query.annotations[field.source].output_field, FLOAT_FIELDS)
+        else:
+            try:
+                model_field = queryset.model._meta.pk if field.source == 'pk' \
+                    else queryset.model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            floats = isinstance(model_field, FLOAT_FIELDS)
+
+        if isinstance(field, ManyRelatedField):
+            if type(field.child_relation) is not PrimaryKeyRelatedField or field.child_relation.pk_field is not None \
+                    or not isinstance(model_field, models.ManyToManyField):
+                return None
+            return ManyColumn(model_field)
+        if isinstance(field, PrimaryKeyRelatedField):
+            if field.pk_field is not None or not isinstance(model_field, models.ForeignKey):
+                return None
+            return Column((field.source,), itemgetter(field.source))
+        if isinstance(field, serializers.FileField) and isinstance(model_field, models.FileField):
+            return Column((field.source,), lambda row: field.to_representation(
+                model_field.attr_class(None, model_field, row[field.source])))
+        if isinstance(field, serializers.DateTimeField):
+            return Column((field.source,), datetime_reader(field))
+        if isinstance(field, PLAIN_FIELDS) or \
+                (isinstance(field, serializers.ChoiceField) and not isinstance(field, serializers.MultipleChoiceField)):
+            if hasattr(model_field, 'from_values'):
+                return Column(model_field.values_lookups, model_field.from_values)
+            return Column((field.source,), itemgetter(field.source), floats or isinstance(field, serializers.FloatField))
+        return None
+
+    def values(self, queryset, *extra):
+        lookups = dict.fromkeys(lookup for column in self.columns.values() for lookup in column.lookups)
+        return queryset.values(*lookups, *(lookup for lookup in extra if lookup not in lookups))
+
+    def render(self, rows):
+        rows = list(rows)
+        readers = []
+        for name, column in self.columns.items():
+            if isinstance(column, ManyColumn):
+                related = column.fetch([row['pk'] for row in rows])
+                readers.append((name, lambda row, related=related: related.get(row['pk'], [])))
+            else:
+                readers.append((name, column.read))
+        return [{name: read(row) for name, read in readers} for row in rows]
+
+
+def datetime_reader(field):
+    source = field.source
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = getattr(field, 'timezone', field.default_timezone())
+    if output_format == api_settings.DATETIME_FORMAT == ISO_8601 and str(field_timezone) == 'UTC':
+        # Left as datetimes: the JSON renderers write UTC ISO 8601 exactly like DateTimeField does.
+        return itemgetter(source)
+
+    def read(row):
+        value = row[source]
+        return None if value is None else field.to_representation(value)
+    return read
+
+
+class ValuesListMixin:
+    # list() skips model instances and per-field serializer work when the serializer is a
+    # projection of columns; the output is the same as the serializer's.
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        projection = Projection.for_serializer(self.get_serializer(), queryset)
+        if projection is None:
+            return super().list(request, *args, **kwargs)
+
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        ordering = [ordering] if isinstance(ordering, str) else ordering
+        rows = projection.values(queryset, *(field.lstrip('-') for field in ordering))
+
+        page = self.paginate_queryset(rows)
+        data = profiled('serializer', projection.render, rows if page is None else page)
+        response = Response(data) if page is None else self.get_paginated_response(data)
+        # Tells ORJSONRenderer there are no floats it could spell differently from JSONRenderer.
+        response.float_free = not projection.floats
+        return response
@@ -0,0 +1,44 @@
+import math
+import re
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# Numbers orjson spells differently from json.dumps: exponents, and magnitudes below 1e-4 written out in full.
+DIVERGENT_FLOAT = re.compile(rb'(?:^|[:,\[])-?(?:\d+(?:\.\d+)?e|0\.0000\d)')
+
+
+def has_non_finite_float(data):
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(has_non_finite_float(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_non_finite_float(value) for value in data)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    # Byte-for-byte the output of JSONRenderer with the default compact, unicode settings. Whatever
+    # orjson can not reproduce exactly (indented output, huge ints, divergent floats, non-finite floats
+    # orjson writes as null) goes to JSONRenderer.
+    # Responses marked float_free skip the scan for floats.
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            content = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_UTC_Z)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        response = (renderer_context or {}).get('response')
+        if not getattr(response, 'float_free', False) and (
+                DIVERGENT_FLOAT.search(content) or b'null' in content and has_non_finite_float(data)):
+            return super().render(data, accepted_media_type, renderer_context)
+        return content.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
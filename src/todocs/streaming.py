@@ -0,0 +1,37 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import FileResponse
+
+
+class AsyncFileResponse(FileResponse):
+    # Served by StreamingASGIHandler, every block is read in a worker thread and a slow client
+    # only holds a suspended coroutine. Any other handler iterates it like a plain FileResponse.
+
+    async def aiter_content(self):
+        read = sync_to_async(self.file_to_stream.read, thread_sensitive=False)
+        while True:
+            chunk = await read(self.block_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+class StreamingASGIHandler(ASGIHandler):
+    # Django 3.2 iterates streaming responses synchronously on the event loop; this handler
+    # awaits AsyncFileResponse bodies instead and defers everything else to Django.
+
+    async def send_response(self, response, send):
+        if not isinstance(response, AsyncFileResponse):
+            return await super().send_response(response, send)
+
+        headers = [(str(header).encode('ascii'), str(value).encode('latin1')) for header, value in response.items()]
+        headers += [(b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+                    for cookie in response.cookies.values()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+
+        try:
+            async for chunk in response.aiter_content():
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
@@ -0,0 +1,62 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from django.db.models import FloatField, Value
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from projects.models import Collaboration
+from projects.serializer import CollaborationSerializer
+from todocs.projections import Projection
+from todocs.renderers import ORJSONRenderer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.mark.parametrize('data', [
+    {'rank': 1e-05, 'small': 0.00012, 'big': 1e16, 'plain': 2.5, 'negative': -3.5e-07},
+    {'text': 'line\u2028separator\u2029 é ✓ \x00\x1f "quoted" \\ /'},
+    {'created': datetime(2021, 1, 15, 19, 11, 0, 123456, tzinfo=timezone.utc), 'naive': datetime(2021, 1, 15)},
+    {'amount': Decimal('1.50'), 'id': uuid.UUID(int=1), 'huge': 2 ** 70, 'label': gettext_lazy('Edit')},
+    [None, True, False, (1, 2), {'nested': [{}]}],
+    1e-05,
+    [1e-05, 2],
+    {'rank': None, 'score': float('nan')},
+    [None, float('inf')],
+], ids=['floats', 'strings', 'datetimes', 'other types', 'structures', 'top-level float', 'first array float',
+        'nan', 'infinity'])
+def test_orjson_renderer_matches_json_renderer(data):
+    try:
+        expected = JSONRenderer().render(data)
+    except ValueError:  # out of range floats under STRICT_JSON
+        with pytest.raises(ValueError):
+            ORJSONRenderer().render(data)
+    else:
+        assert ORJSONRenderer().render(data) == expected
+
+
+def test_orjson_renderer_scans_floats_unless_response_is_float_free():
+    data = {'rank': 1e-05}
+    response = Response(data)
+    assert ORJSONRenderer().render(data, None, {'response': response}) == JSONRenderer().render(data)
+
+    response.float_free = True
+    assert ORJSONRenderer().render(data, None, {'response': response}) == b'{"rank":0.00001}'
+
+
+def test_projection_tracks_float_columns():
+    serializer = CollaborationSerializer()
+    assert not Projection.for_serializer(serializer, Collaboration.objects.all()).floats
+
+    serializer.fields['score'] = serializers.ReadOnlyField()
+    annotated = Collaboration.objects.annotate(score=Value(0.5, output_field=FloatField()))
+    assert Projection.for_serializer(serializer, annotated).floats
+
+
+def test_orjson_renderer_indents_like_json_renderer():
+    data = {'results': [1, 2]}
+    media_type = 'application/json; indent=4'
+    assert ORJSONRenderer().render(data, media_type) == JSONRenderer().render(data, media_type)
@@ -20,6 +20,7 @@ from rest_framework_nested.routers import DefaultRouter, NestedDefaultRouter
 from projects.views import ProjectViewset, CollaborationViewset
 from users.views import UserViewset
 from docs.views import DocumentViewset, AttachmentViewset
+from docs import async_views
 
 
 router = DefaultRouter()
@@ -37,5 +38,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include(router.urls)),
     path('api/v1/', include(docs_router.urls)),
+    path('api/v1/async/projects/<int:project_pk>/attachments/', async_views.upload_attachment),
+    path('api/v1/async/projects/<int:project_pk>/attachments/<int:pk>/download/', async_views.download_attachment),
     path('auth/', include('rest_framework.urls'))
 ]
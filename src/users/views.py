@@ -1,8 +1,10 @@
 from rest_framework import viewsets
 from users.models import User
 from users.serializer import UserSerializer
+from todocs.profiling import ProfiledViewMixin
+from todocs.projections import ValuesListMixin
 
 
-class UserViewset(viewsets.ModelViewSet):
+class UserViewset(ProfiledViewMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer